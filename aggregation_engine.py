@@ -0,0 +1,253 @@
+from functools import partial
+
+import pandas as pd
+
+from profiling import stage
+
+# Rendering of the statistical job analysis from aggregate tables.
+# Every (level, key, category) combination is read from a named table
+# ('state', 'metro_totals', ...) instead of re-masking the full DataFrame
+# inside nested loops. The tables are rollups of the listing cube
+# (listing_cube.py), whether it was built from a DataFrame, streamed from the
+# CSV or updated incrementally, so every source renders the same JSON. Job
+# count percentiles come from mergeable quantile sketches (quantile_sketch.py).
+
+TARGET_STATES = ['AZ', 'FL', 'TX', 'NV', 'TN', 'GA', 'NC']
+
+CITY_CONTEXT_COLUMNS = ['cleaned_state', 'closest_metro', 'closest_airport', 'metro_distance_band']
+
+# Percentile table name -> group keys, matching the index of the level's stats table
+PERCENTILE_LEVELS = {
+    'city_percentiles': ['job_category', 'cleaned_city'],
+    'category_percentiles': ['job_category'],
+    'state_percentiles': ['cleaned_state', 'job_category'],
+    'metro_percentiles': ['closest_metro', 'job_category'],
+    'airport_percentiles': ['closest_airport', 'job_category'],
+}
+
+
+class LazyTables(dict):
+    # Builds each named table on first access and keeps it for later stages
+    def __init__(self, builders, source, source_rows=None):
+        super().__init__()
+        self.builders = builders
+        self.source = source
+        self.source_rows = source_rows
+
+    def __missing__(self, name):
+        with stage(f'table:{name}', rows=self.source_rows) as record:
+            table = self[name] = self.builders[name](self.source)
+            record.output(table)
+        return table
+
+
+def with_percentile_tables(builders, percentiles_builder, percentiles):
+    builders = dict(builders)
+    for name, keys in PERCENTILE_LEVELS.items():
+        builders[name] = partial(percentiles_builder, keys=keys, percentiles=percentiles)
+    return builders
+
+
+def _band_entry(band_stats, index):
+    if index not in band_stats.index:
+        return {'listings': 0, 'avg_jobs': 0, 'cities': 0}
+    row = band_stats.loc[index]
+    return {
+        'listings': int(row['listings']),
+        'avg_jobs': row['avg_jobs'],
+        'cities': int(row['cities'])
+    }
+
+
+def _std_or_zero(value):
+    return value if pd.notna(value) else 0
+
+
+def _int_or_none(value):
+    # Min/max job counts of a group whose listings all lack a job count stay unknown
+    return int(value) if pd.notna(value) else None
+
+
+def _percentile_lookup(percentiles):
+    return percentiles.to_dict('index')
+
+
+def build_category_city_stats(city_stats, categories, percentiles):
+    category_city_stats = {category: {} for category in categories}
+    percentiles = _percentile_lookup(percentiles)
+
+    stats = city_stats[['count', 'mean', 'median', 'min', 'max', 'std']].round(1).astype(float)
+    context = city_stats[CITY_CONTEXT_COLUMNS]
+
+    for (category, city), row, ctx in zip(stats.index, stats.itertuples(index=False), context.itertuples(index=False)):
+        category_city_stats[category][city] = {
+            'state': ctx.cleaned_state,
+            'closest_metro': ctx.closest_metro,
+            'closest_airport': ctx.closest_airport,
+            'metro_distance_band': ctx.metro_distance_band,
+            'listings_count': int(row.count),
+            'avg_jobs_per_listing': row.mean,
+            'median_jobs': row.median,
+            'min_jobs': row.min,
+            'max_jobs': row.max,
+            'std_jobs': _std_or_zero(row.std),
+            'job_count_percentiles': percentiles.get((category, city), {})
+        }
+
+    return category_city_stats
+
+
+def build_state_statistics(stats, totals, percentiles, states=TARGET_STATES):
+    state_statistics = {}
+    percentiles = _percentile_lookup(percentiles)
+    state_categories = {}
+    for (state, category), row in zip(stats.index, stats.round(1).itertuples(index=False)):
+        state_categories.setdefault(state, {})[category] = {
+            'listings_count': int(row.count),
+            'cities_count': int(row.cities),
+            'titles_count': int(row.titles),
+            'avg_jobs_per_listing': row.mean,
+            'avg_jobs_per_city': row.avg_per_city,
+            'median_jobs_per_listing': row.median,
+            'min_jobs_per_listing': _int_or_none(row.min),
+            'max_jobs_per_listing': _int_or_none(row.max),
+            'std_jobs_per_listing': _std_or_zero(row.std),
+            'job_count_percentiles': percentiles.get((state, category), {})
+        }
+
+    for state in states:
+        if state not in totals.index:
+            continue
+        categories = state_categories.get(state, {})
+        state_statistics[state] = {
+            'total_listings': int(totals.at[state, 'total_listings']),
+            'total_categories': len(categories),
+            'total_cities': int(totals.at[state, 'total_cities']),
+            'total_titles': int(totals.at[state, 'total_titles']),
+            'categories': categories
+        }
+
+    return state_statistics
+
+
+def build_metro_statistics(stats, totals, within_25, within_50, percentiles):
+    within_25 = within_25.round(1)
+    within_50 = within_50.round(1)
+    percentiles = _percentile_lookup(percentiles)
+
+    metro_statistics = {}
+    for (metro, category), row in zip(stats.index, stats.round(1).itertuples(index=False)):
+        if metro not in metro_statistics:
+            metro_statistics[metro] = {
+                'state': totals.at[metro, 'state'],
+                'total_listings': int(totals.at[metro, 'total_listings']),
+                'total_cities': int(totals.at[metro, 'total_cities']),
+                'categories': {}
+            }
+        metro_statistics[metro]['categories'][category] = {
+            'all_listings': int(row.count),
+            'cities_count': int(row.cities),
+            'avg_jobs_per_listing': row.mean,
+            'median_jobs': row.median,
+            'min_jobs': _int_or_none(row.min),
+            'max_jobs': _int_or_none(row.max),
+            'job_count_percentiles': percentiles.get((metro, category), {}),
+            'within_25_miles': _band_entry(within_25, (metro, category)),
+            'within_50_miles': _band_entry(within_50, (metro, category))
+        }
+
+    return metro_statistics
+
+
+def build_airport_statistics(stats, totals, percentiles):
+    airport_statistics = {}
+    percentiles = _percentile_lookup(percentiles)
+    for (airport, category), row in zip(stats.index, stats.round(1).itertuples(index=False)):
+        if airport not in airport_statistics:
+            airport_statistics[airport] = {
+                'state': totals.at[airport, 'state'],
+                'total_listings': int(totals.at[airport, 'total_listings']),
+                'total_cities': int(totals.at[airport, 'total_cities']),
+                'categories': {}
+            }
+        airport_statistics[airport]['categories'][category] = {
+            'listings_count': int(row.count),
+            'cities_count': int(row.cities),
+            'avg_jobs_per_listing': row.mean,
+            'median_jobs': row.median,
+            'min_jobs': _int_or_none(row.min),
+            'max_jobs': _int_or_none(row.max),
+            'job_count_percentiles': percentiles.get((airport, category), {})
+        }
+
+    return airport_statistics
+
+
+def build_category_overview(stats, state_averages, percentiles):
+    state_averages = state_averages.round(1)
+    percentiles = _percentile_lookup(percentiles)
+
+    category_overview = {}
+    for category, row in zip(stats.index, stats.round(1).itertuples(index=False)):
+        category_states = state_averages.get(category, pd.Series(dtype=float))
+        category_overview[category] = {
+            'total_listings': int(row.count),
+            'cities_with_jobs': int(row.cities),
+            'states_with_jobs': len(category_states),
+            'avg_jobs_per_listing': row.mean,
+            'avg_jobs_per_city': row.avg_per_city,
+            'median_jobs_per_listing': row.median,
+            'min_jobs_per_listing': _int_or_none(row.min),
+            'max_jobs_per_listing': _int_or_none(row.max),
+            'std_jobs_per_listing': _std_or_zero(row.std),
+            'job_count_percentiles': percentiles.get(category, {}),
+            'state_averages': category_states.to_dict()
+        }
+
+    return category_overview
+
+
+def build_statistical_analysis(tables):
+    with stage('category') as record:
+        category_overview = build_category_overview(
+            tables['category'], tables['category_state_averages'], tables['category_percentiles']
+        )
+        record.output(category_overview)
+    with stage('city') as record:
+        category_city_stats = build_category_city_stats(tables['city'], category_overview, tables['city_percentiles'])
+        record.output(category_city_stats)
+    with stage('state') as record:
+        state_statistics = build_state_statistics(tables['state'], tables['state_totals'], tables['state_percentiles'])
+        record.output(state_statistics)
+    with stage('metro') as record:
+        metro_statistics = build_metro_statistics(
+            tables['metro'], tables['metro_totals'], tables['metro_within_25'], tables['metro_within_50'],
+            tables['metro_percentiles']
+        )
+        record.output(metro_statistics)
+    with stage('airport') as record:
+        airport_statistics = build_airport_statistics(
+            tables['airport'], tables['airport_totals'], tables['airport_percentiles']
+        )
+        record.output(airport_statistics)
+
+    return {
+        'methodology': {
+            'approach': 'Statistical analysis using averages, min, max per geographic unit - NO TOTALS',
+            'key_metrics': ['avg_jobs_per_listing', 'avg_jobs_per_city', 'min_jobs', 'max_jobs'],
+            'geographic_levels': ['city', 'metro (25/50 mile)', 'airport', 'state'],
+            'note': 'Richmond Hill 11 listings means 11 search results averaged to get realistic estimate'
+        },
+        'category_overview': category_overview,
+        'state_statistics': state_statistics,
+        'metro_statistics': metro_statistics,
+        'airport_statistics': airport_statistics,
+        'detailed_city_breakdown': category_city_stats,
+        'summary': {
+            'total_categories': len(category_overview),
+            'total_states': len(state_statistics),
+            'total_metros': len(metro_statistics),
+            'total_airports': len(airport_statistics),
+            'total_cities_analyzed': sum(len(city_data) for city_data in category_city_stats.values())
+        }
+    }
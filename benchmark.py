@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from synthetic_listings import write_synthetic_listings
+
+# Scaling benchmark for the analysis scripts.
+# For every size a synthetic key_categories_job_analysis.csv is written to its
+# own work directory and each stage script runs there as a separate process,
+# in the order the analysis is normally rebuilt, so every stage reads the
+# files the previous one wrote. Wall time and peak RSS of each process go into
+# a JSON report; keep reports from different commits around to spot
+# regressions. Each stage's output is kept next to the data as <stage>.log.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Stage name -> command, run from the size's work directory
+BENCHMARK_STAGES = {
+    'cache': [sys.executable, '-c', 'from ingest import listing_cache; listing_cache()'],
+    'statistics': [sys.executable, os.path.join(REPO_DIR, 'statistical_job_analysis.py')],
+    'nursing_merge': [sys.executable, os.path.join(REPO_DIR, 'merge_nursing_categories.py')],
+    'population': [sys.executable, os.path.join(REPO_DIR, 'add_city_population_analysis.py')],
+    'enhanced': [sys.executable, os.path.join(REPO_DIR, 'add_enhanced_analysis.py')],
+    'power_cities': [sys.executable, os.path.join(REPO_DIR, 'create_power_cities_analysis.py')],
+    'concentration': [sys.executable, os.path.join(REPO_DIR, 'fix_metro_concentration.py')],
+    'comprehensive': [sys.executable, os.path.join(REPO_DIR, 'fix_dashboard_comprehensive.py')],
+    'pipeline': [sys.executable, os.path.join(REPO_DIR, 'pipeline.py')],
+}
+
+DEFAULT_STAGES = ['cache', 'statistics', 'nursing_merge', 'population', 'enhanced', 'power_cities', 'concentration']
+
+
+def maxrss_mb(ru_maxrss):
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    if sys.platform == 'darwin':
+        ru_maxrss /= 1024
+    return round(ru_maxrss / 1024, 1)
+
+
+def run_stage(name, workdir):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+    with open(os.path.join(workdir, f'{name}.log'), 'w') as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen(BENCHMARK_STAGES[name], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives the resource usage of this child alone
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {'seconds': round(seconds, 3), 'peak_rss_mb': maxrss_mb(usage.ru_maxrss), 'exit_code': proc.returncode}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_size(rows, stages, workdir, seed):
+    size_dir = os.path.join(workdir, f'rows_{rows}')
+    os.makedirs(size_dir, exist_ok=True)
+    csv_path = os.path.join(size_dir, 'key_categories_job_analysis.csv')
+
+    print(f'\n=== {rows:,} ROWS ===')
+    started = time.perf_counter()
+    write_synthetic_listings(csv_path, rows, seed)
+    print(f'Generated {os.path.getsize(csv_path) / 1024 ** 2:,.1f} MB of listings in {time.perf_counter() - started:.1f}s')
+
+    results = {}
+    for name in stages:
+        result = run_stage(name, size_dir)
+        result['rows_per_sec'] = round(rows / result['seconds']) if result['seconds'] > 0 else None
+        results[name] = result
+        status = '✅' if result['exit_code'] == 0 else f'❌ exit {result["exit_code"]}, see {name}.log'
+        print(f'  {name:<15} {result["seconds"]:>9.2f}s  {result["peak_rss_mb"]:>9,.1f} MB  {status}')
+
+    return {
+        'rows': rows,
+        'csv_mb': round(os.path.getsize(csv_path) / 1024 ** 2, 1),
+        'workdir': size_dir,
+        'stages': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and memory-profile the analysis stages on synthetic data')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='row counts to benchmark')
+    parser.add_argument('--stages', nargs='+', choices=list(BENCHMARK_STAGES), default=DEFAULT_STAGES,
+                        help='stages to run, in order')
+    parser.add_argument('--workdir', default='benchmark_runs', help='where the synthetic data and stage outputs go')
+    parser.add_argument('--output', default='benchmark_report.json', help='JSON report to write')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the synthetic data')
+    args = parser.parse_args()
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'stages': args.stages,
+        'runs': [],
+    }
+
+    print('=== BENCHMARKING ANALYSIS STAGES ===')
+    for rows in args.sizes:
+        report['runs'].append(benchmark_size(rows, args.stages, args.workdir, args.seed))
+        # Rewritten after every size so a long run still leaves a usable report
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f'\n✅ Benchmark report saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import argparse
+from importlib import import_module
+
+# One command line for the job analysis: python3 cli.py <command> [options].
+# This module imports nothing but argparse. A command imports the module that
+# implements it (and with it pandas) only once it runs, so `cli.py --help`
+# answers at interpreter start-up speed. Every option after the command goes
+# to that module's own parser, so `cli.py <command> --help` lists them. The
+# stage commands run one pipeline stage (pipeline.py) with the pipeline's
+# options (--csv, --output, the stage cache, --profile, ...); the partial
+# ones build on the analysis already in --output.
+
+COMMANDS = {
+    # command: (module, keyword arguments of its main(), summary)
+    'build': ('pipeline', {}, 'run every analysis stage and write the analysis JSON'),
+    'stats': ('pipeline', {'stages': ['statistics']},
+              'write the category/state/city/metro/airport statistics (a new analysis JSON)'),
+    'population': ('pipeline', {'stages': ['population']}, 'add the population-ranked focused city lists'),
+    'enhanced': ('pipeline', {'stages': ['enhanced']}, 'add the state, metro and city map sections'),
+    'power-cities': ('pipeline', {'stages': ['power_cities']}, 'add the top cities per category'),
+    'concentration': ('pipeline', {'stages': ['concentration']}, 'add the metro concentration per state'),
+    'dashboard': ('fix_dashboard_comprehensive', {}, 'regenerate every dashboard section from the merged listings'),
+    'update': ('incremental_stats', {}, 'merge a batch of new listings into the stored aggregates'),
+    'serve': ('query_service', {}, 'serve filter/group/top-k queries over the aggregates on a local HTTP port'),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Job analysis pipeline, dashboard data and query service')
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+    for name, (_, _, summary) in COMMANDS.items():
+        # The command's module parses (and documents) its options, -h included
+        commands.add_parser(name, help=summary, add_help=False)
+    args, command_argv = parser.parse_known_args(argv)
+
+    module, options, _ = COMMANDS[args.command]
+    import_module(module).main(command_argv, prog=f'{parser.prog} {args.command}', **options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import gzip
+import json
+import math
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Dashboard data files.
+# Besides the full statistical_job_analysis.json, the analysis is split into
+# per-section shards plus a small manifest so index.html only fetches what the
+# active tab needs. Each shard keeps the original nesting, so merging the
+# shards back together gives the same object as the full file. The city
+# breakdown, by far the heaviest section, gets one shard per category, and the
+# map clusters one per zoom level (listed under map_levels).
+# Manifest paths are relative to the shard directory.
+#
+# Shards are written in a compact form: no whitespace, and any dict or list
+# of records sharing the same keys becomes one table with the field names
+# listed once and a value array per field (decodeCompact in index.html turns
+# it back into the original objects). Each shard also gets precompressed .gz
+# and, when the brotli package is installed, .br siblings that vercel.json
+# serves with the matching Content-Encoding.
+
+ANALYSIS_FILE = 'statistical_job_analysis.json'
+SHARD_DIR = 'data'
+MANIFEST_FILE = 'manifest.json'
+
+# Shard name -> sections it carries ('a.b' picks key b inside section a)
+DASHBOARD_SHARDS = {
+    'overview': ['methodology', 'category_overview', 'summary', 'summary_stats'],
+    'state': ['state_statistics', 'enhanced_analysis.state_metro_concentration'],
+    'metro': ['metro_statistics', 'metro_area_statistics'],
+    'airport': ['airport_statistics', 'airport_proximity_statistics'],
+    'concentration': [
+        'enhanced_analysis.metro_concentration_50_miles',
+        'enhanced_analysis.state_metro_concentration',
+        'enhanced_analysis.summary_stats'
+    ],
+    'focused_cities': ['focused_city_analysis'],
+    'power_cities': ['power_cities_analysis'],
+    'map': ['enhanced_analysis.city_mapping_data'],
+}
+
+CITY_BREAKDOWN = 'detailed_city_breakdown'
+MAP_CLUSTERS = ('enhanced_analysis', 'map_clusters')
+
+TABLE_MARKER = '__table__'
+
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') or 'category'
+
+
+def _copy_path(source, target, path):
+    keys = path.split('.')
+    for key in keys[:-1]:
+        if not isinstance(source.get(key), dict):
+            return
+        source = source[key]
+        target = target.setdefault(key, {})
+    if keys[-1] in source:
+        target[keys[-1]] = source[keys[-1]]
+
+
+def build_dashboard_shards(analysis_data):
+    shards = {name: {} for name in DASHBOARD_SHARDS}
+    for name, paths in DASHBOARD_SHARDS.items():
+        for path in paths:
+            _copy_path(analysis_data, shards[name], path)
+
+    # Sections no shard claims still reach the dashboard through the overview
+    claimed = {path.split('.')[0] for paths in DASHBOARD_SHARDS.values() for path in paths}
+    for key, value in analysis_data.items():
+        if key not in claimed and key != CITY_BREAKDOWN:
+            shards['overview'][key] = value
+
+    city_shards = {
+        category: {CITY_BREAKDOWN: {category: cities}}
+        for category, cities in analysis_data.get(CITY_BREAKDOWN, {}).items()
+    }
+    return shards, city_shards
+
+
+def build_map_shards(analysis_data):
+    # One shard per zoom level of the map clusters, so the map fetches only the levels it shows
+    section, name = MAP_CLUSTERS
+    levels = analysis_data.get(section, {}).get(name, {}).get('levels', {})
+    return {zoom: {section: {name: {'levels': {zoom: clusters}}}} for zoom, clusters in levels.items()}
+
+
+def _clear_shards(directory):
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(('.json', '.json.gz', '.json.br')):
+            os.remove(os.path.join(directory, name))
+
+
+def _dump(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def _records_fields(records):
+    # Shared key list when every record is a dict with the same keys in the same order
+    if len(records) < 2 or not all(isinstance(record, dict) for record in records):
+        return None
+    fields = list(records[0])
+    if not fields or any(list(record) != fields for record in records):
+        return None
+    return fields
+
+
+def compact_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+
+    if isinstance(value, dict):
+        records = list(value.values())
+        keys = list(value)
+    elif isinstance(value, list):
+        records = value
+        keys = None
+    else:
+        return value
+
+    fields = _records_fields(records)
+    if fields is None:
+        if keys is None:
+            return [compact_value(item) for item in value]
+        return {key: compact_value(item) for key, item in value.items()}
+
+    table = {
+        'fields': fields,
+        'columns': [[compact_value(record[field]) for record in records] for field in fields]
+    }
+    if keys is not None:
+        table['keys'] = keys
+    return {TABLE_MARKER: table}
+
+
+def _dump_compact(data, path):
+    # Compact JSON plus precompressed siblings; returns the encodings written
+    text = json.dumps(compact_value(data), separators=(',', ':')).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(text)
+
+    encodings = ['gz']
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(text, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(text, quality=11))
+        encodings.insert(0, 'br')
+    return encodings
+
+
+def write_dashboard_shards(analysis_data, shard_dir=SHARD_DIR):
+    shards, city_shards = build_dashboard_shards(analysis_data)
+
+    city_dir = os.path.join(shard_dir, 'city')
+    _clear_shards(city_dir)
+    map_dir = os.path.join(shard_dir, 'map')
+    _clear_shards(map_dir)
+
+    manifest = {'format': 'compact', 'encodings': [], 'shards': {}, 'city_breakdown': {}, 'map_levels': {}}
+    for name, shard in shards.items():
+        file_name = f'{name}.json'
+        manifest['encodings'] = _dump_compact(shard, os.path.join(shard_dir, file_name))
+        manifest['shards'][name] = file_name
+
+    used = set()
+    for category, shard in city_shards.items():
+        slug = _slug(category)
+        while slug in used:
+            slug += '_'
+        used.add(slug)
+        _dump_compact(shard, os.path.join(city_dir, f'{slug}.json'))
+        manifest['city_breakdown'][category] = f'city/{slug}.json'
+
+    for zoom, shard in build_map_shards(analysis_data).items():
+        _dump_compact(shard, os.path.join(map_dir, f'z{zoom}.json'))
+        manifest['map_levels'][zoom] = f'map/z{zoom}.json'
+
+    _dump(manifest, os.path.join(shard_dir, MANIFEST_FILE))
+    return manifest
+
+
+def save_analysis(analysis_data, path=ANALYSIS_FILE, shard_dir=SHARD_DIR):
+    # Full analysis file plus the dashboard shards, written together so they never disagree
+    _dump(analysis_data, path)
+    manifest = write_dashboard_shards(analysis_data, shard_dir)
+    shard_count = len(manifest['shards']) + len(manifest['city_breakdown']) + len(manifest['map_levels'])
+    print(f'Wrote {shard_count} dashboard shards to {shard_dir}/')
+
+
+if __name__ == '__main__':
+    # Re-shard an existing analysis file
+    with open(ANALYSIS_FILE, 'r') as f:
+        write_dashboard_shards(json.load(f))
+    print(f'✅ Dashboard shards written to {SHARD_DIR}/')
@@ -0,0 +1,167 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from ingest import DEFAULT_CHUNKSIZE, LISTING_DTYPES, monitor_chunks
+from reference_data import airport_coordinates, city_coordinates, join_reference, metro_coordinates
+
+# Nearest metro / airport assignment from coordinates.
+# GridIndex buckets query locations into lat/lng cells and, per cell, keeps
+# only the reference points that can be nearest to anything inside it (by the
+# triangle inequality on great-circle distance from the cell centre), so each
+# batch of locations is compared against a handful of candidates instead of
+# the full list. Listings are resolved once per distinct (city, state) and the
+# results mapped back, which lets closest_metro, closest_airport and
+# metro_distance_band be re-derived for millions of rows, or for a different
+# metro list, straight from the CSV.
+
+EARTH_RADIUS_MILES = 3958.8
+DEFAULT_CELL_DEGREES = 1.0
+
+METRO_COORDINATES = {metro: [lat, lng] for metro, lat, lng in metro_coordinates().itertuples()}
+
+AIRPORT_COORDINATES = {airport: [lat, lng] for airport, lat, lng in airport_coordinates()[['lat', 'lng']].itertuples()}
+
+# Upper mileage of each metro_distance_band label; anything further is 'Beyond 50 miles'
+DISTANCE_BAND_LIMITS = [(10, 'Within Metro'), (25, 'Within 25 miles'), (50, 'Within 50 miles')]
+BEYOND_BAND = 'Beyond 50 miles'
+
+
+def haversine_miles(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def distance_band(miles):
+    miles = np.asarray(miles, dtype=float)
+    bands = np.select([miles <= limit for limit, _ in DISTANCE_BAND_LIMITS],
+                      [label for _, label in DISTANCE_BAND_LIMITS], BEYOND_BAND).astype(object)
+    bands[np.isnan(miles)] = np.nan
+    return bands
+
+
+class GridIndex:
+    # Exact nearest-point lookups over a fixed set of named coordinates
+    def __init__(self, points, cell_degrees=DEFAULT_CELL_DEGREES):
+        coords = np.array(list(points.values()), dtype=float).reshape(-1, 2)
+        self.names = np.array(list(points), dtype=object)
+        self.lat = coords[:, 0]
+        self.lng = coords[:, 1]
+        self.cell_degrees = cell_degrees
+        self._candidates = {}
+
+    def _cell_candidates(self, cell):
+        if cell not in self._candidates:
+            size = self.cell_degrees
+            lat0, lng0 = cell[0] * size, cell[1] * size
+            centre_lat, centre_lng = lat0 + size / 2, lng0 + size / 2
+
+            # Farthest any point of the cell can be from its centre (corners and edge midpoints)
+            edge_lat = np.array([lat0, lat0, lat0 + size, lat0 + size, lat0, lat0 + size, centre_lat, centre_lat])
+            edge_lng = np.array([lng0, lng0 + size, lng0, lng0 + size, centre_lng, centre_lng, lng0, lng0 + size])
+            radius = haversine_miles(centre_lat, centre_lng, edge_lat, edge_lng).max() * 1.01
+
+            # A point can only be nearest if it might beat the best worst case
+            to_centre = haversine_miles(centre_lat, centre_lng, self.lat, self.lng)
+            self._candidates[cell] = np.flatnonzero(to_centre - radius <= to_centre.min() + radius)
+        return self._candidates[cell]
+
+    def nearest(self, lat, lng):
+        # Name of and miles to the nearest point for every location; NaN where a coordinate is missing
+        lat = np.asarray(lat, dtype=float)
+        lng = np.asarray(lng, dtype=float)
+        names = np.full(len(lat), np.nan, dtype=object)
+        miles = np.full(len(lat), np.nan)
+        if len(self.names) == 0:
+            return names, miles
+
+        known = np.flatnonzero(~(np.isnan(lat) | np.isnan(lng)))
+        rows = np.floor(lat[known] / self.cell_degrees).astype('int64')
+        cols = np.floor(lng[known] / self.cell_degrees).astype('int64')
+
+        # Group locations by cell: hash the packed (row, col) pair, then sort by group code
+        codes, uniques = pd.factorize((rows << 32) + cols)
+        first = np.empty(len(uniques), dtype='int64')
+        first[codes[::-1]] = np.arange(len(codes))[::-1]
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+
+        for cell, members in zip(zip(rows[first], cols[first]), np.split(known[order], bounds)):
+            candidates = self._cell_candidates(cell)
+            distances = haversine_miles(lat[members, None], lng[members, None],
+                                        self.lat[None, candidates], self.lng[None, candidates])
+            best = distances.argmin(axis=1)
+            names[members] = self.names[candidates[best]]
+            miles[members] = distances[np.arange(len(members)), best]
+        return names, miles
+
+
+def assign_nearest(lat, lng, metro_index, airport_index):
+    metros, metro_miles = metro_index.nearest(lat, lng)
+    airports, airport_miles = airport_index.nearest(lat, lng)
+    return pd.DataFrame({
+        'closest_metro': metros,
+        'metro_miles': metro_miles.round(1),
+        'metro_distance_band': distance_band(metro_miles),
+        'closest_airport': airports,
+        'airport_miles': airport_miles.round(1),
+    })
+
+
+def assign_listing_geography(df, metro_index, airport_index, coordinates=None):
+    # Re-derive metro/airport columns per distinct (city, state); places without coordinates keep their values
+    coordinates = city_coordinates() if coordinates is None else coordinates
+    places = df[['cleaned_city', 'cleaned_state']].dropna().drop_duplicates().astype(object)
+    located = join_reference(places, coordinates, 'cleaned_city', 'cleaned_state', how='inner')
+
+    geography = assign_nearest(located['lat'].to_numpy(dtype=float), located['lng'].to_numpy(dtype=float),
+                               metro_index, airport_index)
+    geography.index = pd.MultiIndex.from_frame(located[['cleaned_city', 'cleaned_state']])
+
+    df = df.copy()
+    keys = pd.MultiIndex.from_frame(df[['cleaned_city', 'cleaned_state']].astype(object))
+    matched = keys.isin(geography.index)
+    for column in geography.columns:
+        values = pd.Series(geography[column].reindex(keys).to_numpy(), index=df.index)
+        if column in df.columns:
+            df[column] = values.where(matched, df[column])
+        else:
+            df[column] = values
+    return df
+
+
+def load_points(path, default):
+    # {name: [lat, lng]} from a JSON file, or the built-in table
+    if path is None:
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-derive closest metro/airport and distance bands from coordinates')
+    parser.add_argument('csv', nargs='?', default='key_categories_job_analysis.csv', help='listings CSV to read')
+    parser.add_argument('--output', default='key_categories_job_analysis_geo.csv', help='CSV to write')
+    parser.add_argument('--metros', help='JSON file of {metro: [lat, lng]} to use instead of the major metros')
+    parser.add_argument('--airports', help='JSON file of {airport: [lat, lng]} to use instead of reference/airports.csv')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows processed per batch')
+    args = parser.parse_args()
+
+    print('=== RE-DERIVING METRO AND AIRPORT PROXIMITY ===')
+    metro_index = GridIndex(load_points(args.metros, METRO_COORDINATES))
+    airport_index = GridIndex(load_points(args.airports, AIRPORT_COORDINATES))
+    print(f'Indexed {len(metro_index.names)} metros and {len(airport_index.names)} airports')
+
+    chunks = pd.read_csv(args.csv, dtype=LISTING_DTYPES, chunksize=args.chunksize)
+    for count, chunk in enumerate(monitor_chunks(chunks)):
+        chunk = assign_listing_geography(chunk, metro_index, airport_index)
+        chunk.to_csv(args.output, mode='w' if count == 0 else 'a', header=count == 0, index=False)
+
+    print(f'\n✅ Saved listings with re-derived proximity columns to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
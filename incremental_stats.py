@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+
+from dashboard_data import save_analysis
+from ingest import DEFAULT_CHUNKSIZE, listings_sha256
+from listing_cache import file_sha256
+from listing_cube import cube_tables, load_cube, save_cube, stream_cube
+from pipeline import run_pipeline
+from quantile_sketch import DEFAULT_PERCENTILES
+
+# Incremental aggregate updates.
+# The listing cube (listing_cube.py) keeps mergeable sufficient statistics per
+# (category, state, metro, airport, band, city) cell. A new batch of listings
+# is summarized on its own and merged into the stored cells, so an update costs
+# time proportional to the batch plus the (small) aggregate tables, never to
+# the full listing history. Every city/state/metro/airport x job_category table
+# the analysis needs is a rollup of those cells.
+#
+# A manifest next to the stored statistics records the content hash of the
+# full CSV they were built from and of every batch merged in since, so readers
+# (query_service.py) can tell when the CSV has moved on without them.
+
+STATS_FILE = 'statistical_job_analysis_stats.pkl'
+
+
+def stats_source_path(stats_path=STATS_FILE):
+    return stats_path + '.source.json'
+
+
+def load_stats_source(stats_path=STATS_FILE):
+    # {'listings_sha256': full CSV hash, 'deltas': [batch hashes]}, or None when not recorded
+    try:
+        with open(stats_source_path(stats_path), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_stats_source(source, stats_path=STATS_FILE):
+    with open(stats_source_path(stats_path), 'w') as f:
+        json.dump(source, f, indent=2)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Update the job analysis from a batch of newly scraped listings')
+    parser.add_argument('delta', nargs='?', help='CSV with only the new listings')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild the stored statistics from --csv')
+    parser.add_argument('--csv', default='key_categories_job_analysis.csv', help='full listings CSV used by --rebuild')
+    parser.add_argument('--stats', default=STATS_FILE, help='stored sufficient statistics')
+    parser.add_argument('--output', default='statistical_job_analysis.json', help='analysis JSON to write')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows read per chunk')
+    parser.add_argument('--percentiles', type=float, nargs='+', default=DEFAULT_PERCENTILES,
+                        help='job count percentiles to report per group')
+    args = parser.parse_args(argv)
+
+    print('=== INCREMENTAL JOB ANALYSIS UPDATE ===')
+
+    stats = None
+    if not args.rebuild and os.path.exists(args.stats):
+        stats = load_cube(args.stats)
+        source = load_stats_source(args.stats) or {'listings_sha256': None, 'deltas': []}
+        print(f'Loaded {len(stats["cells"]):,} stored aggregate cells from {args.stats}')
+        if 'histogram' in stats or 'sketch' not in stats:
+            print('Stored statistics predate the indexed per-cell sketches, rebuilding them')
+            stats = None
+
+    if stats is None:
+        print(f'Summarizing records from {args.csv}')
+        stats = stream_cube(args.csv, args.chunksize)
+        source = {'listings_sha256': listings_sha256(args.csv), 'deltas': []}
+
+    if args.delta:
+        print(f'Merging new records from {args.delta}')
+        stats = stream_cube(args.delta, args.chunksize, stats, use_cache=False)
+        source['deltas'].append(file_sha256(args.delta))
+
+    save_cube(stats, args.stats)
+    save_stats_source(source, args.stats)
+    print(f'Saved {len(stats["cells"]):,} aggregate cells to {args.stats}')
+
+    analysis_data = run_pipeline(cube_tables(stats, args.percentiles))
+
+    save_analysis(analysis_data, args.output)
+
+    print(f'\n✅ Updated analysis saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from listing_cache import open_listing_cache, read_cached_listing_chunks, read_cached_listings
+
+# Typed, chunked loading of the listings CSV.
+# Explicit dtypes skip pandas' type inference, and reading in chunks lets the
+# aggregators consume the file piece by piece so memory stays bounded by the
+# chunk size instead of the size of the extract. By default the rows come from
+# the columnar cache (listing_cache.py), so the CSV text is parsed only once.
+# The geographic and category keys come back dictionary-encoded as pandas
+# categoricals, so groupbys, masks and nunique run on small integer codes.
+#
+# Category merges (e.g. Licensed Practical Nurse into Registered Nurse) are
+# declared in a mapping table (CATEGORY_MAPPING_FILE) and applied while the
+# rows are read: only the categorical's category list is renamed and its codes
+# renumbered, so a merge costs no extra I/O and the CSV is never rewritten.
+
+LISTINGS_CSV = 'key_categories_job_analysis.csv'
+
+TEXT_COLUMNS = [
+    'extracted_job_title', 'job_category', 'cleaned_city', 'cleaned_state',
+    'closest_metro', 'closest_airport', 'metro_distance_band'
+]
+
+CATEGORY_COLUMNS = [
+    'job_category', 'cleaned_city', 'cleaned_state',
+    'closest_metro', 'closest_airport', 'metro_distance_band'
+]
+
+LISTING_DTYPES = {column: 'object' for column in TEXT_COLUMNS}
+# Nullable, so a blank job count reads as missing (the cube counts such rows without a count)
+LISTING_DTYPES['job_count'] = 'Int64'
+
+ENCODED_DTYPES = dict(LISTING_DTYPES, **{column: 'category' for column in CATEGORY_COLUMNS})
+
+DEFAULT_CHUNKSIZE = 250_000
+
+CATEGORY_MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference', 'category_mapping.csv')
+
+
+def load_category_mapping(path=CATEGORY_MAPPING_FILE):
+    # {category: category it is merged into} from a CSV with category and merged_into columns
+    table = pd.read_csv(path, dtype=str)
+    return dict(zip(table['category'], table['merged_into']))
+
+
+def remap_categories(df, mapping, column='job_category'):
+    # Apply a category mapping (one step, no chains) to the categories rather than to every row
+    if not mapping or column not in df.columns:
+        return df
+    values = df[column]
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return df.assign(**{column: values.replace(mapping)})
+
+    renamed = values.cat.categories.map(lambda category: mapping.get(category, category))
+    categories = pd.Index(sorted(renamed.unique()))
+    # The appended -1 keeps missing values (code -1) missing
+    recode = np.append(categories.get_indexer(renamed), -1)
+    codes = recode[values.cat.codes.to_numpy()]
+    return df.assign(**{column: pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))})
+
+
+def listing_cache(path=LISTINGS_CSV):
+    return open_listing_cache(path, lambda: pd.read_csv(path, dtype=LISTING_DTYPES, chunksize=DEFAULT_CHUNKSIZE))
+
+
+def listings_sha256(path=LISTINGS_CSV):
+    # Content hash of the listings, as recorded when the columnar cache was built
+    return listing_cache(path)['source']['sha256']
+
+
+def read_listings(path=LISTINGS_CSV, columns=None, use_cache=True, category_mapping=None):
+    if not use_cache:
+        df = pd.read_csv(path, dtype=ENCODED_DTYPES, usecols=columns)
+    else:
+        df = read_cached_listings(listing_cache(path), columns, categorical=CATEGORY_COLUMNS)
+    return remap_categories(df, category_mapping)
+
+
+def read_listing_chunks(path=LISTINGS_CSV, chunksize=DEFAULT_CHUNKSIZE, columns=None, use_cache=True,
+                        category_mapping=None):
+    if not use_cache:
+        chunks = pd.read_csv(path, dtype=ENCODED_DTYPES, usecols=columns, chunksize=chunksize)
+    else:
+        chunks = read_cached_listing_chunks(listing_cache(path), chunksize, columns, categorical=CATEGORY_COLUMNS)
+    if not category_mapping:
+        return chunks
+    return (remap_categories(chunk, category_mapping) for chunk in chunks)
+
+
+def peak_memory_mb():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak / 1024
+
+
+def monitor_chunks(chunks):
+    # Pass chunks through, reporting throughput and peak memory once the file is done
+    started = time.perf_counter()
+    rows = 0
+    for count, chunk in enumerate(chunks, 1):
+        yield chunk
+        rows += len(chunk)
+        print(f'  chunk {count}: {rows:,} rows ingested')
+
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f'Ingested {rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec), peak memory {peak_memory_mb():,.1f} MB')
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Columnar on-disk cache of the listings CSV.
+# The first run converts the CSV into one flat binary file per column (text
+# columns as int32 codes into a sorted lookup table stored in the manifest) and
+# later runs memory-map just the columns they ask for instead of re-parsing the
+# text. Coded columns can be handed out as pandas categoricals that share the
+# manifest's lookup table, so they never have to be decoded to strings.
+# The cache is tied to the source file's size and mtime; when only the mtime
+# changed, the content hash decides whether the cache is still good.
+
+CACHE_DIR = '.listings_cache'
+CACHE_VERSION = 3
+MANIFEST_FILE = 'manifest.json'
+CODE_DTYPE = 'int32'
+
+
+def cache_path(path):
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, CACHE_DIR, name)
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(cache):
+    try:
+        with open(os.path.join(cache, MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(cache, manifest):
+    with open(os.path.join(cache, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _is_current(path, cache, manifest):
+    if manifest is None or manifest.get('version') != CACHE_VERSION:
+        return False
+
+    stat = os.stat(path)
+    source = manifest['source']
+    if source['size'] != stat.st_size:
+        return False
+    if source['mtime_ns'] == stat.st_mtime_ns:
+        return True
+
+    # Touched but possibly unchanged (copy, checkout): compare contents
+    if source['sha256'] != file_sha256(path):
+        return False
+    source['mtime_ns'] = stat.st_mtime_ns
+    _write_manifest(cache, manifest)
+    return True
+
+
+def _sort_codes(file_path, lookup, chunksize=1 << 20):
+    # Renumber codes so that code order matches the sorted category order
+    categories = sorted(lookup)
+    remap = np.empty(len(lookup) + 1, dtype=CODE_DTYPE)
+    remap[[lookup[value] for value in categories]] = np.arange(len(categories), dtype=CODE_DTYPE)
+    remap[-1] = -1
+
+    if os.path.getsize(file_path):
+        codes = np.memmap(file_path, dtype=CODE_DTYPE, mode='r+')
+        for start in range(0, len(codes), chunksize):
+            codes[start:start + chunksize] = remap[codes[start:start + chunksize]]
+        codes.flush()
+        del codes
+    return categories
+
+
+def write_listing_cache(path, chunks):
+    cache = cache_path(path)
+    building = cache + '.tmp'
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+
+    stat = os.stat(path)
+    source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(path)}
+
+    lookups = {}
+    dtypes = {}
+    files = {}
+    rows = 0
+    try:
+        for chunk in chunks:
+            for column in chunk.columns:
+                if column not in files:
+                    files[column] = open(os.path.join(building, column + '.bin'), 'wb')
+
+                values = chunk[column]
+                if not pd.api.types.is_numeric_dtype(values):
+                    # Codes in first-appearance order, -1 for missing values
+                    lookup = lookups.setdefault(column, {})
+                    for value in pd.unique(values.dropna()):
+                        lookup.setdefault(value, len(lookup))
+                    data = values.map(lookup).fillna(-1).to_numpy(CODE_DTYPE)
+                elif isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+                    # Nullable numbers are stored as floats, missing values as NaN
+                    data = values.to_numpy(dtype='float64', na_value=np.nan)
+                else:
+                    data = values.to_numpy()
+                dtypes[column] = data.dtype.str
+                files[column].write(data.tobytes())
+            rows += len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+
+    categories = {
+        column: _sort_codes(os.path.join(building, column + '.bin'), lookup)
+        for column, lookup in lookups.items()
+    }
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'source': source,
+        'rows': rows,
+        'columns': {
+            column: {'dtype': dtypes[column], 'categories': categories.get(column)}
+            for column in files
+        }
+    }
+    _write_manifest(building, manifest)
+
+    shutil.rmtree(cache, ignore_errors=True)
+    os.rename(building, cache)
+    manifest['path'] = cache
+    return manifest
+
+
+def open_listing_cache(path, build_chunks):
+    # Manifest of an up-to-date cache for path, (re)built from build_chunks() when needed
+    cache = cache_path(path)
+    manifest = _read_manifest(cache)
+    if not _is_current(path, cache, manifest):
+        print(f'Building columnar cache for {path}')
+        manifest = write_listing_cache(path, build_chunks())
+    manifest['path'] = cache
+    return manifest
+
+
+def _read_column(manifest, column, start, stop, categorical):
+    spec = manifest['columns'][column]
+    if manifest['rows'] == 0:
+        data = np.empty(0, dtype=spec['dtype'])
+    else:
+        data = np.memmap(os.path.join(manifest['path'], column + '.bin'), dtype=spec['dtype'],
+                         mode='r', shape=(manifest['rows'],))[start:stop]
+
+    if spec['categories'] is None:
+        return np.array(data)
+    if column in categorical:
+        return pd.Categorical.from_codes(data, dtype=pd.CategoricalDtype(spec['categories']))
+    # Appending NaN to the lookup table maps code -1 back to a missing value
+    lookup = np.array(spec['categories'] + [np.nan], dtype=object)
+    return lookup[data]
+
+
+def read_cached_listings(manifest, columns=None, start=0, stop=None, categorical=()):
+    # Only the requested columns are mapped; coded columns listed in categorical stay encoded
+    names = [column for column in manifest['columns'] if columns is None or column in columns]
+    stop = manifest['rows'] if stop is None else min(stop, manifest['rows'])
+    data = {column: _read_column(manifest, column, start, stop, categorical) for column in names}
+    return pd.DataFrame(data, index=pd.RangeIndex(start, stop))
+
+
+def read_cached_listing_chunks(manifest, chunksize, columns=None, categorical=()):
+    for start in range(0, manifest['rows'], chunksize):
+        yield read_cached_listings(manifest, columns, start, start + chunksize, categorical)
@@ -0,0 +1,319 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from aggregation_engine import CITY_CONTEXT_COLUMNS, LazyTables, with_percentile_tables
+from ingest import DEFAULT_CHUNKSIZE, monitor_chunks, read_listing_chunks, remap_categories
+from metro_concentration import LEGACY_WITHIN_25_BANDS, LEGACY_WITHIN_50_BANDS, METRO_COUNT_KEYS
+from profiling import stage
+from quantile_sketch import DEFAULT_PERCENTILES, sketch_medians, sketch_percentiles, sketch_values
+
+# Materialized cube of job count statistics.
+# The finest grain is one cell per (category, state, metro, airport, band, city)
+# holding mergeable sufficient statistics (rows, count, sum, sum of squares,
+# min, max) and a quantile sketch of its job counts, next to the distinct
+# titles per (state, category). Every aggregate the analysis reports is a
+# slice of the cells (slice_cube) rolled up to the level it needs (rollup),
+# medians and percentiles included, so building a section never goes back to
+# the listings.
+#
+# Cells and titles are indexed by a 64-bit hash of their dimensions, and the
+# sketch by (cell, bucket) with one count column. A cell's sketch has at most
+# one row per bucket (a few hundred for job counts), so the stored cube grows
+# with the geography and categories seen, not with the number of listings.
+# Cubes built from separate batches of listings merge by looking each delta
+# row up in those indexes: matching rows are updated, new rows appended, so a
+# merge costs about the size of the delta.
+#
+# Cells, and so every rollup made with sort=False, keep the first-appearance
+# order of the listings, and the first cell of a group carries the geography
+# of the group's first listing (first_values).
+
+CUBE_DIMENSIONS = [
+    'job_category', 'cleaned_state', 'closest_metro', 'closest_airport', 'metro_distance_band', 'cleaned_city'
+]
+TITLE_DIMENSIONS = ['cleaned_state', 'job_category', 'extracted_job_title']
+
+MEASURE_AGGREGATIONS = {'rows': 'sum', 'count': 'sum', 'total': 'sum', 'total_sq': 'sum', 'min': 'min', 'max': 'max'}
+# The same, as elementwise merges of a cell's stored and new statistics
+MEASURE_MERGES = {'rows': np.add, 'count': np.add, 'total': np.add, 'total_sq': np.add, 'min': np.fmin, 'max': np.fmax}
+
+
+def _row_keys(frame, columns, name):
+    return pd.Index(pd.util.hash_pandas_object(frame[columns], index=False).to_numpy(), name=name)
+
+
+def build_cube(df):
+    # Cube cells for one batch of listings; job counts as floats (missing ones NaN) whichever way they were read
+    df = df.assign(job_count=df['job_count'].astype('float64'))
+    df['job_count_sq'] = df['job_count'] ** 2
+    grouped = df.groupby(CUBE_DIMENSIONS, sort=False, dropna=False)
+    cells = grouped.agg(
+        rows=('job_count', 'size'),
+        count=('job_count', 'count'),
+        total=('job_count', 'sum'),
+        total_sq=('job_count_sq', 'sum'),
+        min=('job_count', 'min'),
+        max=('job_count', 'max'),
+    ).reset_index()
+    cells.index = _row_keys(cells, CUBE_DIMENSIONS, 'cell')
+
+    # Each listing's cell key (groups are numbered in the same first-appearance order as cells)
+    df['cell'] = cells.index.to_numpy()[grouped.ngroup().to_numpy()]
+    sketch = sketch_values(df, ['cell']).set_index(['cell', 'bucket'])
+
+    titles = df[TITLE_DIMENSIONS].drop_duplicates().reset_index(drop=True)
+    titles.index = _row_keys(titles, TITLE_DIMENSIONS, 'title')
+
+    return {'cells': cells, 'sketch': sketch, 'titles': titles}
+
+
+def _merge_rows(table, delta, merge_columns):
+    # table with delta's rows merged in: rows already in table (same index) are
+    # combined column by column, the others appended in delta's order
+    position = table.index.get_indexer(delta.index)
+    found = position >= 0
+    merged = table.copy(deep=False)
+    if found.any():
+        for column, merge in merge_columns.items():
+            values = table[column].to_numpy().copy()
+            values[position[found]] = merge(values[position[found]], delta[column].to_numpy()[found])
+            merged[column] = values
+    return merged if found.all() else pd.concat([merged, delta[~found]])
+
+
+def _regroup(cube):
+    # Rows with the same index combined, in first-appearance order (the indexes are integers, so this is cheap)
+    cells = cube['cells'].groupby(level='cell', sort=False).agg(
+        dict({dimension: 'first' for dimension in CUBE_DIMENSIONS}, **MEASURE_AGGREGATIONS)
+    )
+    sketch = cube['sketch'].groupby(level=['cell', 'bucket'], sort=False).sum()
+    titles = cube['titles'][~cube['titles'].index.duplicated()]
+    return {'cells': cells, 'sketch': sketch, 'titles': titles}
+
+
+def _combine_deltas(deltas):
+    # One delta from several
+    if len(deltas) == 1:
+        return deltas[0]
+    return _regroup({name: pd.concat([delta[name] for delta in deltas]) for name in ['cells', 'sketch', 'titles']})
+
+
+def merge_cubes(cube, *deltas):
+    # The cube with the deltas merged in. Existing cells keep their place and
+    # new ones follow, so first-appearance order (and "first row" context) is
+    # preserved; the work follows the size of the deltas, not of the cube.
+    delta = _combine_deltas(deltas)
+    return {
+        'cells': _merge_rows(cube['cells'], delta['cells'], MEASURE_MERGES),
+        'sketch': _merge_rows(cube['sketch'], delta['sketch'], {'n': np.add}),
+        'titles': _merge_rows(cube['titles'], delta['titles'], {})
+    }
+
+
+def stream_cube(path, chunksize=DEFAULT_CHUNKSIZE, cube=None, use_cache=True, category_mapping=None):
+    # Build the cube chunk by chunk so only one chunk is ever held in memory.
+    # Chunk cubes wait until they hold as many cells as the cube and are then
+    # merged together, so small chunks don't each pay for a merge.
+    with stage('ingest') as record:
+        chunks = read_listing_chunks(path, chunksize, use_cache=use_cache, category_mapping=category_mapping)
+        pending = []
+        for chunk in monitor_chunks(chunks):
+            pending.append(build_cube(chunk))
+            if cube is None:
+                cube = pending.pop()
+            elif sum(len(delta['cells']) for delta in pending) >= len(cube['cells']):
+                cube = merge_cubes(cube, *pending)
+                pending = []
+        if pending:
+            cube = merge_cubes(cube, *pending)
+        if cube is not None:
+            record.rows = cube_listings(cube)
+            record.output(cube)
+    return cube
+
+
+def remap_cube(cube, mapping):
+    # The cube with job categories merged as at ingest ({category: category it is merged into});
+    # cells that become the same cell are combined, in first-appearance order
+    if not mapping:
+        return cube
+    cells = remap_categories(cube['cells'], mapping)
+    cells.index = _row_keys(cells, CUBE_DIMENSIONS, 'cell')
+    renamed = pd.Series(cells.index.to_numpy(), index=cube['cells'].index)
+
+    sketch = cube['sketch'].reset_index()
+    sketch['cell'] = renamed.reindex(sketch['cell']).to_numpy()
+    titles = remap_categories(cube['titles'], mapping)
+    titles.index = _row_keys(titles, TITLE_DIMENSIONS, 'title')
+    return _regroup({'cells': cells, 'sketch': sketch.set_index(['cell', 'bucket']), 'titles': titles})
+
+
+def load_cube(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def save_cube(cube, path):
+    with open(path, 'wb') as f:
+        pickle.dump(cube, f)
+
+
+def cube_listings(cube):
+    return int(cube['cells']['rows'].sum())
+
+
+def slice_cube(cube, **where):
+    # The cells whose dimensions match where (one value or a list of values per
+    # dimension), with their sketches. Distinct titles are only kept per
+    # (state, category), so they are dropped from slices on any other dimension.
+    sliced = {}
+    for name in ['cells', 'titles']:
+        if name not in cube or name == 'titles' and not set(where) <= set(TITLE_DIMENSIONS):
+            continue
+        table = cube[name]
+        mask = np.ones(len(table), dtype=bool)
+        for dimension, values in where.items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            mask &= table[dimension].isin(values).to_numpy()
+        sliced[name] = table[mask]
+    sketch = cube['sketch']
+    sliced['sketch'] = sketch[sketch.index.get_level_values('cell').isin(sliced['cells'].index)]
+    return sliced
+
+
+def _known(frame, keys):
+    return frame[frame[keys].notna().all(axis=1)]
+
+
+def rollup(cube, keys, sort=False):
+    # Statistics for every group of keys; cells with a missing key are left out.
+    # listings counts rows, count/mean/std/min/max describe the job counts (sample
+    # std, like pandas), cities and avg_per_city (the average of the per-city
+    # averages) are added above city level and titles where the cube tracks them.
+    cells = _known(cube['cells'], keys)
+    rolled = cells.groupby(keys, sort=sort, dropna=False).agg(MEASURE_AGGREGATIONS)
+
+    count = rolled['count']
+    table = pd.DataFrame({'listings': rolled['rows'], 'count': count, 'mean': rolled['total'] / count},
+                         index=rolled.index)
+    variance = (rolled['total_sq'] - rolled['total'] ** 2 / count) / (count - 1)
+    table['min'] = rolled['min']
+    table['max'] = rolled['max']
+    table['std'] = np.sqrt(variance.clip(lower=0)).where(count > 1)
+
+    if 'cleaned_city' not in keys:
+        city_cells = cells[cells['cleaned_city'].notna()]
+        city_cells = city_cells.groupby(keys + ['cleaned_city'], sort=False, dropna=False).agg(
+            MEASURE_AGGREGATIONS
+        ).reset_index()
+        city_cells['mean'] = city_cells['total'] / city_cells['count']
+        city_groups = city_cells.groupby(keys, sort=False)
+        table['cities'] = city_groups.size().reindex(table.index, fill_value=0)
+        table['avg_per_city'] = city_groups['mean'].mean()
+
+    if 'titles' in cube and set(keys) <= set(TITLE_DIMENSIONS[:2]):
+        titles = _known(cube['titles'], keys).groupby(keys)['extracted_job_title'].nunique()
+        table['titles'] = titles.reindex(table.index, fill_value=0)
+    return table
+
+
+def cube_sketch(cube, keys):
+    # The cells' sketches as rows of (keys..., bucket, n), ready to roll up
+    sketch = cube['sketch'].reset_index()
+    groups = cube['cells'][keys].reindex(sketch['cell']).reset_index(drop=True)
+    return pd.concat([groups, sketch[['bucket', 'n']]], axis=1)
+
+
+def cube_percentiles(cube, keys, percentiles=DEFAULT_PERCENTILES):
+    return sketch_percentiles(cube_sketch(cube, keys), keys, percentiles)
+
+
+def medians(cube, keys):
+    # Job count medians per group, read from the merged sketches (within RELATIVE_ACCURACY)
+    return sketch_medians(cube_sketch(cube, keys), keys)
+
+
+def distinct_counts(cube, keys, dimension):
+    # Distinct known values of one dimension per group of keys
+    cells = _known(cube['cells'], keys)
+    return cells.groupby(keys, sort=False)[dimension].nunique()
+
+
+def first_values(cube, keys, columns):
+    # Dimension values of each group's first listing
+    return _known(cube['cells'], keys).drop_duplicates(keys).set_index(keys, drop=False)[columns]
+
+
+# The named tables aggregation_engine renders the analysis from, as rollups of the cube
+def level_stats(cube, key):
+    keys = [key, 'job_category'] if key else ['job_category']
+    table = rollup(cube, keys)
+    table['median'] = medians(cube, keys)
+    return table
+
+
+def level_totals(cube, key):
+    rolled = rollup(cube, [key])
+    totals = rolled[['listings', 'cities']].rename(columns={'listings': 'total_listings', 'cities': 'total_cities'})
+    if 'titles' in rolled:
+        totals['total_titles'] = rolled['titles']
+    totals['state'] = first_values(cube, [key], ['cleaned_state'])['cleaned_state']
+    return totals
+
+
+def city_level_stats(cube):
+    keys = ['job_category', 'cleaned_city']
+    table = rollup(cube, keys, sort=True)
+    table['median'] = medians(cube, keys)
+    context = first_values(cube, keys, CITY_CONTEXT_COLUMNS)
+    return table[['count', 'mean', 'median', 'min', 'max', 'std']].join(context)
+
+
+def band_stats(cube, key, bands):
+    table = rollup(slice_cube(cube, metro_distance_band=bands), [key, 'job_category'])
+    return table[['listings', 'mean', 'cities']].rename(columns={'mean': 'avg_jobs'})
+
+
+def category_state_averages(cube):
+    return rollup(cube, ['job_category', 'cleaned_state'], sort=True)['mean']
+
+
+def metro_counts(cube):
+    counts = cube['cells'].groupby(METRO_COUNT_KEYS, sort=False, dropna=False)['rows'].sum()
+    return counts.reset_index(name='listings')
+
+
+CUBE_TABLE_BUILDERS = {
+    'city': city_level_stats,
+    'category': lambda cube: level_stats(cube, None),
+    'category_state_averages': category_state_averages,
+    'state': lambda cube: level_stats(cube, 'cleaned_state'),
+    'state_totals': lambda cube: level_totals(cube, 'cleaned_state'),
+    'metro': lambda cube: level_stats(cube, 'closest_metro'),
+    'metro_totals': lambda cube: level_totals(cube, 'closest_metro'),
+    'metro_within_25': lambda cube: band_stats(cube, 'closest_metro', LEGACY_WITHIN_25_BANDS),
+    'metro_within_50': lambda cube: band_stats(cube, 'closest_metro', LEGACY_WITHIN_50_BANDS),
+    'airport': lambda cube: level_stats(cube, 'closest_airport'),
+    'airport_totals': lambda cube: level_totals(cube, 'closest_airport'),
+    'metro_counts': metro_counts,
+}
+
+
+def cube_tables(cube, percentiles=DEFAULT_PERCENTILES):
+    return LazyTables(with_percentile_tables(CUBE_TABLE_BUILDERS, cube_percentiles, percentiles), cube,
+                      len(cube['cells']))
+
+
+class DeferredCubeTables(LazyTables):
+    # cube_tables() for a cube that load() only produces once a stage asks for a table
+    def __init__(self, load, percentiles=DEFAULT_PERCENTILES):
+        super().__init__(with_percentile_tables(CUBE_TABLE_BUILDERS, cube_percentiles, percentiles), None)
+        self.load = load
+
+    def __missing__(self, name):
+        if self.source is None:
+            self.source = self.load()
+            self.source_rows = len(self.source['cells'])
+        return super().__missing__(name)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Level-of-detail clustering of the mapped cities for the dashboard map.
+# Cities with coordinates are projected to Web Mercator and, for every zoom
+# level from MIN_ZOOM to MAX_ZOOM, grouped into square grid cells
+# CLUSTER_RADIUS_PX screen pixels wide at that zoom. A cell at one zoom is
+# exactly four cells at the next, so the levels nest into one hierarchy (each
+# cluster names its parent one level up) and a map at any zoom draws at most
+# one marker per cell in view, however many cities there are. One level above
+# MAX_ZOOM holds every city on its own; the levels stop early once every city
+# is on its own already (max_zoom). Each cluster carries the mean location
+# and the bounds of its cities and, per category, the number of cities,
+# listings, listing-weighted average jobs and min/max jobs over the cities it
+# holds, so the map can show any category without the city data.
+
+MIN_ZOOM = 3
+MAX_ZOOM = 11
+CLUSTER_RADIUS_PX = 60
+TILE_SIZE = 256
+MAX_LATITUDE = 85.05112878
+
+CATEGORY_STATS = ['cities', 'listings', 'avg_jobs', 'min_jobs', 'max_jobs']
+
+
+def mercator(lat, lng):
+    # Web Mercator world coordinates, both in [0, 1)
+    x = (np.asarray(lng, dtype=float) + 180) / 360
+    sin = np.sin(np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)
+    return x, y
+
+
+def mapped_cities(city_mapping_data):
+    # (one row per city with coordinates, one row per (city, category)) frames
+    places = []
+    stats = []
+    for city, data in city_mapping_data.items():
+        if not data.get('coordinates'):
+            continue
+        lat, lng = data['coordinates']
+        places.append((city, data['state'], lat, lng))
+        for category, category_stats in data['categories'].items():
+            stats.append((len(places) - 1, category, category_stats['avg_jobs'], category_stats['listings'],
+                          category_stats['min_jobs'], category_stats['max_jobs']))
+
+    cities = pd.DataFrame(places, columns=['city', 'state', 'lat', 'lng'])
+    cities['x'], cities['y'] = mercator(cities['lat'], cities['lng'])
+    stats = pd.DataFrame(stats, columns=['city_id', 'category', 'avg_jobs', 'listings', 'min_jobs', 'max_jobs'])
+    return cities, stats
+
+
+def grid_cells(cities, zoom, radius_px=CLUSTER_RADIUS_PX):
+    # Integer (column, row) of each city's cell at a zoom level
+    scale = TILE_SIZE * 2 ** zoom / radius_px
+    return np.floor(cities['x'] * scale).astype(int), np.floor(cities['y'] * scale).astype(int)
+
+
+def cluster_level(cities, stats, cluster, parent):
+    # Cluster records of one level, given each city's cluster id and each cluster's parent id
+    cities = cities.assign(cluster=cluster)
+    clusters = cities.groupby('cluster', sort=True).agg(
+        lat=('lat', 'mean'), lng=('lng', 'mean'),
+        south=('lat', 'min'), west=('lng', 'min'), north=('lat', 'max'), east=('lng', 'max'),
+        cities=('city', 'size'), city=('city', 'first'), state=('state', 'first'),
+    )
+    # Cells nest, so all cities of a cluster share one parent
+    parents = pd.Series(parent, index=cities['cluster'], dtype=object)
+    clusters['parent'] = parents[~parents.index.duplicated()].reindex(clusters.index)
+
+    stats = stats.assign(cluster=cities['cluster'].to_numpy()[stats['city_id'].to_numpy()],
+                         total_jobs=stats['avg_jobs'] * stats['listings'])
+    grouped = stats.groupby(['cluster', 'category'], sort=True)
+    by_category = grouped.agg(cities=('city_id', 'size'), listings=('listings', 'sum'),
+                              min_jobs=('min_jobs', 'min'), max_jobs=('max_jobs', 'max'))
+    # Categories without any known average stay unknown rather than 0
+    by_category['total_jobs'] = grouped['total_jobs'].sum(min_count=1)
+    by_category['avg_jobs'] = (by_category['total_jobs'] / by_category['listings']).round(1)
+    totals = by_category.assign(
+        known_listings=by_category['listings'].where(by_category['total_jobs'].notna())
+    ).groupby(level='cluster')[['listings', 'known_listings', 'total_jobs']].sum(min_count=1)
+    clusters['listings'] = totals['listings'].reindex(clusters.index, fill_value=0)
+    clusters['avg_jobs'] = (totals['total_jobs'] / totals['known_listings']).reindex(clusters.index).round(1)
+
+    category_stats = by_category[CATEGORY_STATS].astype(object)
+    category_stats = category_stats.where(by_category[CATEGORY_STATS].notna(), None)
+    categories = {cluster_id: {} for cluster_id in clusters.index}
+    for (cluster_id, category), row in zip(category_stats.index, category_stats.to_dict('records')):
+        categories[cluster_id][category] = row
+
+    return [
+        {
+            'id': cluster_id,
+            'parent': row['parent'],
+            'lat': round(row['lat'], 5),
+            'lng': round(row['lng'], 5),
+            'bounds': [[round(row['south'], 5), round(row['west'], 5)], [round(row['north'], 5), round(row['east'], 5)]]
+                      if row['cities'] > 1 else None,
+            'cities': int(row['cities']),
+            'label': f'{row["city"]}, {row["state"]}' if row['cities'] == 1 else None,
+            'listings': int(row['listings']),
+            'avg_jobs': None if pd.isna(row['avg_jobs']) else row['avg_jobs'],
+            'categories': categories[cluster_id],
+        }
+        for cluster_id, row in zip(clusters.index, clusters.to_dict('records'))
+    ]
+
+
+def build_map_clusters(city_mapping_data, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius_px=CLUSTER_RADIUS_PX):
+    cities, stats = mapped_cities(city_mapping_data)
+    summary = {'min_zoom': min_zoom, 'max_zoom': min_zoom, 'radius_px': radius_px, 'cities_mapped': len(cities)}
+    if cities.empty:
+        return dict(summary, levels={})
+
+    levels = {}
+    parent = np.full(len(cities), None, dtype=object)
+    for zoom in range(min_zoom, max_zoom + 2):
+        if zoom <= max_zoom:
+            column, row = grid_cells(cities, zoom, radius_px)
+            cluster = (f'{zoom}/' + column.astype(str) + '/' + row.astype(str)).to_numpy(dtype=object)
+        else:
+            # Top level: every city on its own
+            cluster = np.array([f'{zoom}/{index}' for index in range(len(cities))], dtype=object)
+        levels[str(zoom)] = cluster_level(cities, stats, cluster, parent)
+        parent = cluster
+        if len(levels[str(zoom)]) == len(cities):
+            # Every city is already on its own, so deeper levels would repeat this one
+            break
+
+    return dict(summary, max_zoom=zoom, levels=levels)
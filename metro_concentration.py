@@ -0,0 +1,200 @@
+import pandas as pd
+
+from ingest import DEFAULT_CHUNKSIZE, monitor_chunks, read_listing_chunks
+from ranking import ranked_lists, top_k
+
+# Vectorized metro concentration analysis.
+# Band counts, unique cities and top categories per metro come out of grouped
+# and crosstab operations instead of a df.iterrows() loop. Everything works on
+# listing counts per (metro, band, category, city, state), which can come from
+# the raw listings or from stored aggregates.
+
+METRO_COUNT_KEYS = ['closest_metro', 'metro_distance_band', 'job_category', 'cleaned_city', 'cleaned_state']
+
+DISTANCE_BANDS = {
+    'within_metro': 'Within Metro',
+    'within_25_miles': 'Within 25 miles',
+    'within_50_miles': 'Within 50 miles',
+    'beyond_50_miles': 'Beyond 50 miles',
+}
+
+WITHIN_50_BANDS = ['Within Metro', 'Within 25 miles', 'Within 50 miles']
+
+# Band labels used by the original statistical_job_analysis.py output
+LEGACY_WITHIN_25_BANDS = ['0-25 miles']
+LEGACY_WITHIN_50_BANDS = ['0-25 miles', '25-50 miles']
+
+
+def metro_listing_counts(df):
+    # Listings per (metro, band, category, city, state) in first-appearance order
+    counts = df.groupby(METRO_COUNT_KEYS, sort=False, dropna=False).size()
+    return counts.reset_index(name='listings')
+
+
+def merge_metro_counts(counts):
+    merged = pd.concat(counts, ignore_index=True)
+    merged = merged.groupby(METRO_COUNT_KEYS, sort=False, dropna=False)['listings'].sum()
+    return merged.reset_index()
+
+
+def stream_metro_counts(path, chunksize=DEFAULT_CHUNKSIZE):
+    # Count listings chunk by chunk, reading only the columns the counts need
+    chunks = read_listing_chunks(path, chunksize, columns=METRO_COUNT_KEYS)
+    return merge_metro_counts([metro_listing_counts(chunk) for chunk in monitor_chunks(chunks)])
+
+
+def metro_states(counts):
+    # State of the first listing seen for each metro
+    first_rows = counts.drop_duplicates('closest_metro')
+    return dict(zip(first_rows['closest_metro'], first_rows['cleaned_state']))
+
+
+def top_categories_by_metro(data, top_n=3):
+    # Listing counts per (metro, category), highest first; ties keep first-appearance order
+    counts = data.groupby(['closest_metro', 'job_category'], sort=False, dropna=False)['listings'].sum()
+    counts = counts.reset_index()
+
+    categories_count = counts.groupby('closest_metro', sort=False).size()
+    top = ranked_lists(top_k(counts, 'closest_metro', 'listings', top_n), 'closest_metro',
+                       {'category': 'job_category', 'listings': 'listings'}, rank_field=None)
+
+    top_categories = {
+        metro: [(entry['category'], entry['listings']) for entry in entries] for metro, entries in top.items()
+    }
+    return top_categories, categories_count
+
+
+def build_metro_concentration(counts):
+    data = counts[counts['closest_metro'].notna() & counts['metro_distance_band'].notna()]
+    metros = data['closest_metro'].unique()
+
+    band_counts = pd.crosstab(data['closest_metro'], data['metro_distance_band'], values=data['listings'], aggfunc='sum')
+    band_counts = band_counts.reindex(index=metros, columns=list(DISTANCE_BANDS.values())).fillna(0)
+    total_listings = data.groupby('closest_metro', sort=False)['listings'].sum()
+    unique_cities = data.groupby('closest_metro', sort=False)['cleaned_city'].nunique()
+    top_categories, categories_count = top_categories_by_metro(data)
+    states = metro_states(counts)
+
+    metro_concentration = {}
+    for metro in metros:
+        total = int(total_listings[metro])
+        bands = {key: int(band_counts.at[metro, band]) for key, band in DISTANCE_BANDS.items()}
+        within_50_total = int(band_counts.loc[metro, WITHIN_50_BANDS].sum())
+        concentration_ratio = (within_50_total / total * 100) if total > 0 else 0
+
+        metro_concentration[metro] = {
+            'state': states.get(metro, 'Unknown'),
+            'total_listings': total,
+            'unique_cities': int(unique_cities[metro]),
+            **bands,
+            'within_50_total': within_50_total,
+            'concentration_percentage': round(concentration_ratio, 1),
+            'categories_count': int(categories_count[metro]),
+            'top_categories': top_categories[metro]
+        }
+
+    return metro_concentration
+
+
+def build_state_metro_concentration(metro_concentration):
+    state_metro_concentration = {}
+
+    for metro, data in metro_concentration.items():
+        state = state_metro_concentration.setdefault(data['state'], {
+            'metros': [],
+            'total_metros': 0,
+            'total_listings': 0,
+            'total_within_50_miles': 0,
+            'total_cities': 0
+        })
+        state['metros'].append({
+            'metro': metro,
+            'total_listings': data['total_listings'],
+            'within_50_total': data['within_50_total'],
+            'concentration_percentage': data['concentration_percentage'],
+            'unique_cities': data['unique_cities']
+        })
+        state['total_listings'] += data['total_listings']
+        state['total_within_50_miles'] += data['within_50_total']
+        state['total_cities'] += data['unique_cities']
+
+    for data in state_metro_concentration.values():
+        data['total_metros'] = len(data['metros'])
+        data['state_concentration_percentage'] = round(
+            (data['total_within_50_miles'] / data['total_listings'] * 100), 1
+        ) if data['total_listings'] > 0 else 0
+
+        data['avg_concentration'] = round(
+            sum(metro['concentration_percentage'] for metro in data['metros']) / len(data['metros']), 1
+        ) if len(data['metros']) > 0 else 0
+
+        # Sort metros by total listings
+        data['metros'].sort(key=lambda x: x['total_listings'], reverse=True)
+
+    return state_metro_concentration
+
+
+# Legacy shape written by add_enhanced_analysis.py, which counts the
+# '0-25 miles' / '25-50 miles' bands and keeps rows without a band.
+
+def build_enhanced_metro_concentration(counts):
+    data = counts[counts['closest_metro'].notna()]
+    metros = data['closest_metro'].unique()
+
+    total_listings = data.groupby('closest_metro', sort=False)['listings'].sum()
+    within_50 = data[data['metro_distance_band'].isin(LEGACY_WITHIN_50_BANDS)].groupby('closest_metro')['listings'].sum()
+    top_categories, categories_count = top_categories_by_metro(data)
+    states = metro_states(counts)
+
+    metro_concentration = {}
+    for metro in metros:
+        total = int(total_listings[metro])
+        within_50_miles = int(within_50.get(metro, 0))
+        concentration_ratio = (within_50_miles / total * 100) if total > 0 else 0
+
+        metro_concentration[metro] = {
+            'state': states.get(metro, 'Unknown'),
+            'total_job_listings': total,
+            'within_50_miles_listings': within_50_miles,
+            'concentration_percentage': round(concentration_ratio, 1),
+            'categories_count': int(categories_count[metro]),
+            'top_categories': top_categories[metro]
+        }
+
+    return metro_concentration
+
+
+def build_enhanced_state_metro_concentration(metro_concentration):
+    state_metro_concentration = {}
+
+    for metro, data in metro_concentration.items():
+        state = state_metro_concentration.setdefault(data['state'], {
+            'metros': [],
+            'total_metros': 0,
+            'avg_concentration': 0,
+            'total_listings_in_metros': 0,
+            'total_within_50_miles': 0
+        })
+        state['metros'].append({
+            'metro': metro,
+            'concentration_percentage': data['concentration_percentage'],
+            'total_listings': data['total_job_listings'],
+            'within_50_miles': data['within_50_miles_listings']
+        })
+        state['total_listings_in_metros'] += data['total_job_listings']
+        state['total_within_50_miles'] += data['within_50_miles_listings']
+
+    for data in state_metro_concentration.values():
+        data['total_metros'] = len(data['metros'])
+        data['avg_concentration'] = round(
+            sum(metro['concentration_percentage'] for metro in data['metros']) / len(data['metros']), 1
+        ) if len(data['metros']) > 0 else 0
+
+        data['state_concentration_percentage'] = round(
+            (data['total_within_50_miles'] / data['total_listings_in_metros'] * 100), 1
+        ) if data['total_listings_in_metros'] > 0 else 0
+
+        # Sort metros by concentration
+        data['metros'].sort(key=lambda x: x['concentration_percentage'], reverse=True)
+
+    return state_metro_concentration
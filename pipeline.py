@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+
+from aggregation_engine import LazyTables, build_statistical_analysis
+from dashboard_data import save_analysis
+from add_city_population_analysis import add_city_population_analysis
+from add_enhanced_analysis import TOP_CATEGORIES, add_enhanced_analysis
+from create_power_cities_analysis import TOP_CITIES, create_power_cities_analysis
+from fix_metro_concentration import fix_metro_concentration
+from ingest import CATEGORY_MAPPING_FILE, DEFAULT_CHUNKSIZE, listings_sha256, load_category_mapping, read_listings
+from listing_cube import DeferredCubeTables, build_cube, cube_listings, cube_tables, stream_cube
+from profiling import add_profiling_arguments, profiling_active, profiling_from_args, stage
+from quantile_sketch import DEFAULT_PERCENTILES
+from reference_data import COORDINATES_FILE, MAJOR_METROS_FILE, POPULATIONS_FILE
+from stage_cache import STAGE_CACHE_DIR, StageCache, digest, file_digest
+
+# In-memory staged pipeline.
+# Every stage runs over one shared set of aggregate tables (rolled up lazily
+# from a single listing cube) and one analysis dict, so the CSV is parsed once
+# and statistical_job_analysis.json is written once instead of being reloaded
+# and re-dumped by each script. With --profile every stage, and every table
+# and level it builds, is timed and measured (profiling.py).
+#
+# Each stage declares its inputs besides the analysis it is handed (the
+# listings, reference files, parameters), and the pipeline keeps every stage's
+# output in a content-addressed cache under those inputs (stage_cache.py), so
+# a rerun recomputes only the stages whose inputs changed.
+#
+# In a notebook, analyze_listings() runs the stages on an already-loaded
+# listings frame and returns the analysis without writing anything, e.g.
+# analyze_listings(df, stages=['statistics']) and then
+# analyze_listings(tables, analysis, stages=['power_cities']) with
+# tables = listing_tables(df) to aggregate the frame only once.
+
+PIPELINE_STAGES = []
+
+DEFAULT_PARAMETERS = {
+    'listings': None,
+    'percentiles': DEFAULT_PERCENTILES,
+    'top_categories': TOP_CATEGORIES,
+    'top_cities': TOP_CITIES,
+}
+
+
+def pipeline_stage(name, inputs=lambda parameters: {}):
+    # inputs(parameters) -> everything the stage reads besides the analysis
+    def register(func):
+        PIPELINE_STAGES.append((name, func, inputs))
+        return func
+    return register
+
+
+@pipeline_stage('statistics', inputs=lambda parameters: {
+    'listings': parameters['listings'], 'percentiles': parameters['percentiles']
+})
+def run_statistics(tables, analysis_data, parameters):
+    return build_statistical_analysis(tables)
+
+
+@pipeline_stage('population', inputs=lambda parameters: {
+    'populations': file_digest(POPULATIONS_FILE), 'major_metros': file_digest(MAJOR_METROS_FILE)
+})
+def run_population(tables, analysis_data, parameters):
+    return add_city_population_analysis(analysis_data)
+
+
+@pipeline_stage('enhanced', inputs=lambda parameters: {
+    'listings': parameters['listings'], 'coordinates': file_digest(COORDINATES_FILE),
+    'top_categories': parameters['top_categories']
+})
+def run_enhanced(tables, analysis_data, parameters):
+    return add_enhanced_analysis(analysis_data, tables['metro_counts'], parameters['top_categories'])
+
+
+@pipeline_stage('power_cities', inputs=lambda parameters: {'top_cities': parameters['top_cities']})
+def run_power_cities(tables, analysis_data, parameters):
+    return create_power_cities_analysis(analysis_data, parameters['top_cities'])
+
+
+@pipeline_stage('concentration', inputs=lambda parameters: {'listings': parameters['listings']})
+def run_concentration(tables, analysis_data, parameters):
+    return fix_metro_concentration(analysis_data, tables['metro_counts'])
+
+
+def stage_names():
+    return [name for name, _, _ in PIPELINE_STAGES]
+
+
+def run_pipeline(tables, analysis_data=None, stages=None, parameters=None, cache=None):
+    # With a cache, parameters['listings'] must identify the listings the tables come from
+    analysis_data = analysis_data if analysis_data is not None else {}
+    parameters = dict(DEFAULT_PARAMETERS, **(parameters or {}))
+    if cache is not None:
+        # Digest of the analysis in hand, and of the one the stages so far produced
+        current = produced = digest(analysis_data)
+        last_hit = None
+
+    for name, func, inputs in PIPELINE_STAGES:
+        if stages is not None and name not in stages:
+            continue
+        if cache is not None:
+            stage_inputs = inputs(parameters)
+            cache_key = cache.key(name, stage_inputs, produced)
+            output_digest = cache.lookup(name, cache_key)
+            if output_digest is not None:
+                print(f'\n=== PIPELINE STAGE: {name} (cached) ===')
+                last_hit, produced = (name, cache_key), output_digest
+                continue
+            if produced != current:
+                analysis_data = cache.load(*last_hit)
+
+        print(f'\n=== PIPELINE STAGE: {name} ===')
+        # Stages may edit sections in place, so sections are compared by content
+        before = {key: digest(value) for key, value in analysis_data.items()} if profiling_active() else None
+        listings = cube_listings(tables.source) if tables.source is not None else None
+        with stage(name, rows=listings) as record:
+            analysis_data = func(tables, analysis_data, parameters)
+        if before is not None:
+            # Output size counts the sections the stage added or changed
+            record.output({key: value for key, value in analysis_data.items() if before.get(key) != digest(value)})
+        if cache is not None:
+            current = produced = cache.store(name, cache_key, analysis_data, stage_inputs)
+
+    if cache is not None and produced != current:
+        with stage('cached_output'):
+            analysis_data = cache.load(*last_hit)
+    return analysis_data
+
+
+def listing_tables(listings, percentiles=DEFAULT_PERCENTILES):
+    # Aggregate tables of a listings frame (read_listings() or any frame with its columns)
+    return cube_tables(build_cube(listings), percentiles)
+
+
+def analyze_listings(listings, analysis_data=None, stages=None, parameters=None):
+    # The stages run on a listings frame, or on tables from listing_tables() to reuse them across calls
+    parameters = dict(DEFAULT_PARAMETERS, **(parameters or {}))
+    tables = listings if isinstance(listings, LazyTables) else listing_tables(listings, parameters['percentiles'])
+    return run_pipeline(tables, analysis_data, stages, parameters)
+
+
+def load_cube(csv, chunksize, category_mapping):
+    if chunksize:
+        # Aggregate the CSV chunk by chunk into the listing cube
+        return stream_cube(csv, chunksize, category_mapping=category_mapping)
+    with stage('ingest') as record:
+        df = read_listings(csv, category_mapping=category_mapping)
+        print(f'Loaded {len(df):,} records from {csv}')
+        cube = build_cube(df)
+        record.rows = len(df)
+        record.output(cube)
+    return cube
+
+
+def main(argv=None, prog=None, stages=None):
+    # stages fixes the stages to run (cli.py's per-stage commands) instead of taking --stages
+    if stages is None:
+        description = 'Run the job analysis stages in memory and write the result once'
+    else:
+        description = f'Run the {", ".join(stages)} stage of the job analysis'
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    parser.add_argument('--csv', default='key_categories_job_analysis.csv', help='listings CSV to analyze')
+    parser.add_argument('--output', default='statistical_job_analysis.json', help='analysis JSON to write')
+    if stages is None:
+        parser.add_argument('--stages', nargs='+', choices=stage_names(),
+                            help='run only these stages on top of the existing output file')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='rows read per chunk when streaming the CSV (0 loads it in one piece)')
+    parser.add_argument('--percentiles', type=float, nargs='+', default=DEFAULT_PERCENTILES,
+                        help='job count percentiles to report per group')
+    parser.add_argument('--merge-categories', nargs='?', const=CATEGORY_MAPPING_FILE, metavar='MAPPING_CSV',
+                        help='merge job categories while reading, as declared in the mapping table '
+                             '(default reference/category_mapping.csv)')
+    parser.add_argument('--top-categories', type=int, default=TOP_CATEGORIES,
+                        help='categories listed per state and per focused city')
+    parser.add_argument('--top-cities', type=int, default=TOP_CITIES, help='power cities listed per category')
+    parser.add_argument('--cache-dir', default=STAGE_CACHE_DIR,
+                        help=f'where stage outputs are cached by their inputs (default {STAGE_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every stage and leave the cache alone')
+    add_profiling_arguments(parser)
+    args = parser.parse_args(argv)
+    stages = args.stages if stages is None else stages
+    category_mapping = load_category_mapping(args.merge_categories) if args.merge_categories else None
+
+    print('=== JOB ANALYSIS PIPELINE ===')
+    with profiling_from_args(args):
+        parameters = {'percentiles': args.percentiles, 'top_categories': args.top_categories,
+                      'top_cities': args.top_cities}
+        if args.no_cache:
+            cache = None
+            tables = cube_tables(load_cube(args.csv, args.chunksize, category_mapping), args.percentiles)
+        else:
+            cache = StageCache(args.cache_dir)
+            # The cube is only loaded (or read back from the cache) once a stage to be computed needs a table
+            parameters['listings'] = digest({'csv': listings_sha256(args.csv), 'chunksize': args.chunksize,
+                                             'category_mapping': category_mapping})
+            tables = DeferredCubeTables(
+                lambda: cache.cached('cube', parameters['listings'],
+                                     lambda: load_cube(args.csv, args.chunksize, category_mapping)),
+                args.percentiles
+            )
+
+        # A partial run builds on the previously written analysis
+        analysis_data = None
+        if stages and 'statistics' not in stages:
+            with open(args.output, 'r') as f:
+                analysis_data = json.load(f)
+
+        analysis_data = run_pipeline(tables, analysis_data, stages, parameters, cache)
+
+        with stage('save') as record:
+            save_analysis(analysis_data, args.output)
+            record.output_bytes = os.path.getsize(args.output)
+
+    print(f'\n✅ Pipeline complete, saved analysis to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
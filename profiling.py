@@ -0,0 +1,247 @@
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ingest import peak_memory_mb
+
+# Per-stage profiling of an analysis run.
+# Code is instrumented with `with stage(name, rows=...) as record:` around
+# every pipeline stage, aggregate table and rendered level. Inside a profiled
+# run (profiling()) each stage records its wall and CPU time, the rows it
+# processed, the peak memory it allocated on top of what was live when it
+# started (tracemalloc, which sees numpy/pandas buffers as well as Python
+# objects), the process RSS high-water mark and the size of what it produced.
+# Stages nest (a pipeline stage contains the tables it builds), so every
+# entry carries its path. One named stage can also run under cProfile, its
+# stats dumped next to the report with the top functions listed in it.
+# Outside a profiled run stage() hands out a record that ignores everything,
+# so the instrumentation costs nothing by default.
+
+DEFAULT_REPORT_FILE = 'profile_report.json'
+HOT_FUNCTIONS = 25
+
+_active = None
+
+
+def _frame_bytes(frame):
+    # Series report a single number, frames one per column
+    return int(np.sum(frame.memory_usage(deep=True)))
+
+
+def output_size(result):
+    # (rows, bytes) of a stage's result: frames by their memory, anything else as its JSON
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result), _frame_bytes(result)
+    if isinstance(result, dict) and result and all(isinstance(value, pd.DataFrame) for value in result.values()):
+        return sum(len(value) for value in result.values()), sum(_frame_bytes(value) for value in result.values())
+    size = len(json.dumps(result, default=str).encode('utf-8'))
+    return (len(result) if hasattr(result, '__len__') else None), size
+
+
+def _mb(size):
+    return round(size / 1024 ** 2, 2)
+
+
+class StageRecord:
+    def __init__(self, name, path, rows=None):
+        self.name = name
+        self.path = path
+        self.rows = rows
+        self.output_rows = None
+        self.output_bytes = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self.end_bytes = 0
+        self.max_rss_mb = None
+        self.cprofile = None
+
+    def output(self, result):
+        self.output_rows, self.output_bytes = output_size(result)
+
+    def as_dict(self, trace_memory):
+        entry = {
+            'stage': self.path,
+            'depth': self.path.count('/'),
+            'wall_seconds': round(self.wall_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / self.wall_seconds) if self.rows and self.wall_seconds else None,
+            'output_rows': self.output_rows,
+            'output_bytes': self.output_bytes,
+            'max_rss_mb': self.max_rss_mb,
+        }
+        if trace_memory:
+            entry['peak_traced_mb'] = _mb(self.peak_bytes - self.start_bytes)
+            entry['retained_traced_mb'] = _mb(self.end_bytes - self.start_bytes)
+        if self.cprofile:
+            entry['cprofile'] = self.cprofile
+        return entry
+
+
+class _IgnoredRecord:
+    # Stand-in handed out when no profiler is active
+    rows = None
+
+    def output(self, result):
+        pass
+
+
+class Profiler:
+    def __init__(self, trace_memory=True, cprofile_stage=None, cprofile_dir='.'):
+        self.trace_memory = trace_memory
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_dir = cprofile_dir
+        self.records = []
+        self.stack = []
+        self.started = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.started = datetime.now(timezone.utc)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def stop(self):
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = time.process_time() - self._cpu
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def _profile_stats(self, profile, record):
+        name = record.path.replace('/', '.').replace(':', '_')
+        path = os.path.join(self.cprofile_dir, f'{name}.prof')
+        profile.dump_stats(path)
+        stats = pstats.Stats(profile)
+        hot = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:HOT_FUNCTIONS]
+        record.cprofile = {
+            'stats_file': path,
+            'top_cumulative': [
+                {'function': f'{filename}:{line}({function})', 'calls': calls,
+                 'total_seconds': round(total, 4), 'cumulative_seconds': round(cumulative, 4)}
+                for (filename, line, function), (_, calls, total, cumulative, _) in hot
+            ]
+        }
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        parent = self.stack[-1] if self.stack else None
+        record = StageRecord(name, f'{parent.path}/{name}' if parent else name, rows)
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                # Keep the parent's peak so far before the counter restarts for this stage
+                parent.peak_bytes = max(parent.peak_bytes, peak)
+            tracemalloc.reset_peak()
+            record.start_bytes = record.peak_bytes = current
+
+        profile = cProfile.Profile() if self.cprofile_stage in (name, record.path) else None
+        self.records.append(record)
+        self.stack.append(record)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record.wall_seconds = time.perf_counter() - wall
+            record.cpu_seconds = time.process_time() - cpu
+            if self.trace_memory:
+                # The counter also covers nested stages, so their peaks count towards this one
+                record.end_bytes, peak = tracemalloc.get_traced_memory()
+                record.peak_bytes = max(record.peak_bytes, peak)
+            record.max_rss_mb = round(peak_memory_mb(), 1)
+            self.stack.pop()
+            if profile is not None:
+                self._profile_stats(profile, record)
+
+    def report(self):
+        return {
+            'created': self.started.isoformat(timespec='seconds'),
+            'command': [os.path.basename(sys.argv[0])] + sys.argv[1:],
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'trace_memory': self.trace_memory,
+            'total': {
+                'wall_seconds': round(self.wall_seconds, 4),
+                'cpu_seconds': round(self.cpu_seconds, 4),
+                'max_rss_mb': round(peak_memory_mb(), 1),
+            },
+            'stages': [record.as_dict(self.trace_memory) for record in self.records],
+        }
+
+    def print_summary(self):
+        print('\n=== PROFILE ===')
+        print(f'{"stage":<48} {"wall s":>8} {"cpu s":>8} {"rows":>12} {"peak MB":>9} {"out KB":>10}')
+        for record in self.records:
+            label = '  ' * record.path.count('/') + record.name
+            peak = f'{_mb(record.peak_bytes - record.start_bytes):.1f}' if self.trace_memory else '-'
+            rows = f'{record.rows:,}' if record.rows is not None else '-'
+            out = f'{record.output_bytes / 1024:,.1f}' if record.output_bytes is not None else '-'
+            print(f'{label:<48} {record.wall_seconds:>8.3f} {record.cpu_seconds:>8.3f} {rows:>12} {peak:>9} {out:>10}')
+        print(f'{"total":<48} {self.wall_seconds:>8.3f} {self.cpu_seconds:>8.3f}')
+
+
+@contextmanager
+def profiling(report_path=DEFAULT_REPORT_FILE, trace_memory=True, cprofile_stage=None):
+    # Profile every stage run inside the block and write the report when it ends
+    global _active
+    profiler = Profiler(trace_memory, cprofile_stage, os.path.dirname(os.path.abspath(report_path)))
+    _active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = None
+        with open(report_path, 'w') as f:
+            json.dump(profiler.report(), f, indent=2)
+        profiler.print_summary()
+        print(f'Profile report saved to {report_path}')
+
+
+@contextmanager
+def stage(name, rows=None):
+    if _active is None:
+        yield _IgnoredRecord()
+        return
+    with _active.stage(name, rows) as record:
+        yield record
+
+
+def profiling_active():
+    # Whether stage() records anything, for callers whose measurement costs work of its own
+    return _active is not None
+
+
+def add_profiling_arguments(parser):
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_REPORT_FILE, metavar='REPORT_JSON',
+                        help=f'record time, rows and memory per stage (default report {DEFAULT_REPORT_FILE})')
+    parser.add_argument('--profile-stage', metavar='STAGE',
+                        help='also run this stage (name or path, e.g. statistics/state) under cProfile')
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help='skip tracemalloc when profiling (faster; only the RSS high-water mark is kept)')
+
+
+def profiling_from_args(args):
+    # The profiling context the --profile options ask for, or a no-op one
+    if not args.profile and not args.profile_stage:
+        return nullcontext()
+    return profiling(args.profile or DEFAULT_REPORT_FILE, not args.no_trace_memory, args.profile_stage)
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Mergeable quantile sketches for job counts.
+# Each value is mapped to a logarithmic bucket, i such that
+# gamma^(i-1) < value <= gamma^i with gamma = (1 + a) / (1 - a), and a sketch
+# is just the number of values per (group keys, bucket). Two sketches merge by
+# adding their counts, so they can be built chunk by chunk, stored, and rolled
+# up from fine cells to any coarser level with the same groupby-sum used for
+# the other aggregates. Reading a bucket back as 2 * gamma^i / (gamma + 1)
+# puts every reported quantile within relative error a of the exact value at
+# that rank, and a group holds at most log(max / min) / log(gamma) buckets
+# (about 430 for job counts between 1 and 5,000 at a = 1%) however many
+# listings it has. Zero counts get their own bucket.
+
+RELATIVE_ACCURACY = 0.01
+DEFAULT_PERCENTILES = [50, 75, 90]
+
+ZERO_BUCKET = np.iinfo('int32').min
+
+
+def _gamma(accuracy):
+    return (1 + accuracy) / (1 - accuracy)
+
+
+def bucket_index(values, accuracy=RELATIVE_ACCURACY):
+    values = np.asarray(values, dtype=float)
+    buckets = np.full(len(values), ZERO_BUCKET, dtype='int32')
+    positive = values > 0
+    buckets[positive] = np.ceil(np.log(values[positive]) / np.log(_gamma(accuracy)))
+    return buckets
+
+
+def bucket_value(buckets, accuracy=RELATIVE_ACCURACY):
+    buckets = np.asarray(buckets)
+    gamma = _gamma(accuracy)
+    values = 2 * gamma ** buckets.astype(float) / (gamma + 1)
+    return np.where(buckets == ZERO_BUCKET, 0.0, values)
+
+
+def sketch_values(df, keys, column='job_count', accuracy=RELATIVE_ACCURACY):
+    # Sketch of df[column] per group of keys, as rows of (keys..., bucket, n)
+    known = df[df[column].notna()]
+    buckets = pd.Series(bucket_index(known[column], accuracy), index=known.index, name='bucket')
+    sketch = known.groupby([known[key] for key in keys] + [buckets], sort=False, dropna=False).size()
+    return sketch.reset_index(name='n')
+
+
+def merge_sketches(sketches, keys):
+    merged = pd.concat(sketches, ignore_index=True)
+    return merged.groupby(keys + ['bucket'], sort=False, dropna=False)['n'].sum().reset_index()
+
+
+def percentile_label(percentile):
+    return f'p{percentile:g}'
+
+
+def _ranked_buckets(sketch, keys):
+    # Per group of keys, the non-empty buckets in value order with the rank range [start, end) each covers
+    known = sketch[sketch[keys].notna().all(axis=1)]
+    hist = known.groupby(keys + ['bucket'])['n'].sum()
+    hist = hist[hist > 0].reset_index()
+
+    grouped = hist.groupby(keys, sort=False)['n']
+    hist['end'] = grouped.cumsum()
+    hist['start'] = hist['end'] - hist['n']
+    hist['size'] = grouped.transform('sum')
+    return hist
+
+
+def _value_at_rank(hist, keys, rank, accuracy):
+    at_rank = hist[(hist['start'] <= rank) & (rank < hist['end'])]
+    return pd.Series(bucket_value(at_rank['bucket'], accuracy), index=pd.MultiIndex.from_frame(at_rank[keys]))
+
+
+def _by_keys(table, keys):
+    result = pd.DataFrame(table)
+    if len(keys) == 1:
+        result.index = result.index.get_level_values(0)
+    return result.round(1)
+
+
+def sketch_percentiles(sketch, keys, percentiles=DEFAULT_PERCENTILES, accuracy=RELATIVE_ACCURACY):
+    # One column per percentile (p50, p90, ...), indexed by keys; rank q picks
+    # the value at position floor(q * (n - 1)) of the group's sorted values
+    hist = _ranked_buckets(sketch, keys)
+    table = {}
+    for percentile in percentiles:
+        rank = np.floor(percentile / 100 * (hist['size'] - 1))
+        table[percentile_label(percentile)] = _value_at_rank(hist, keys, rank, accuracy)
+    return _by_keys(table, keys)
+
+
+def sketch_medians(sketch, keys, accuracy=RELATIVE_ACCURACY):
+    # Medians indexed by keys; like pandas, the mean of the two middle values of an even-sized group
+    hist = _ranked_buckets(sketch, keys)
+    lower = _value_at_rank(hist, keys, (hist['size'] - 1) // 2, accuracy)
+    upper = _value_at_rank(hist, keys, hist['size'] // 2, accuracy)
+    return _by_keys({'median': (lower + upper) / 2}, keys)['median']
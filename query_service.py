@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+from aggregation_engine import build_airport_statistics, build_category_city_stats, build_metro_statistics
+from incremental_stats import STATS_FILE, load_stats_source
+from ingest import CATEGORY_MAPPING_FILE, LISTINGS_CSV, listings_sha256, load_category_mapping
+from listing_cube import (
+    CUBE_DIMENSIONS, cube_listings, cube_tables, load_cube, medians, remap_cube, rollup, slice_cube, stream_cube
+)
+from quantile_sketch import DEFAULT_PERCENTILES
+from ranking import top_k
+
+# Local query service for the dashboard.
+# The listing cube is loaded once, with the category merges of
+# reference/category_mapping.csv applied like the dashboard applies them, and
+# every request is a slice-and-rollup of it, answered over plain HTTP by an
+# asyncio server (no framework needed). The unfiltered /metro, /airport and
+# /category entries are rendered for every name when the service starts, so
+# the dashboard's own requests are lookups. Responses are cached by their
+# normalized query in an LRU cache; misses are computed in a worker thread so
+# cached answers keep flowing while a new cut is rolled up, and concurrent
+# requests for the same query share one computation.
+#
+#   /query?group=closest_airport,job_category&cleaned_state=TX&sort=mean&top=5&per=closest_airport
+#       any cut of the cube: group keys, filters on any dimension (repeat a
+#       parameter for several values), optional top-k per group
+#   /metro?name=Houston, /airport?name=IAH, /category?name=Welder
+#       the same entry the static JSON has for that metro/airport/category,
+#       optionally narrowed by dimension filters
+#   /health
+#       cube size and cache statistics
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+CACHE_SIZE = 1024
+
+QUERY_MEASURES = ['listings', 'count', 'mean', 'median', 'min', 'max', 'std', 'cities', 'avg_per_city']
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'
+}
+
+
+class QueryError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _jsonable(value):
+    # NaN isn't valid JSON, so missing values go out as null
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _encode(result):
+    return json.dumps(_jsonable(result)).encode('utf-8')
+
+
+def _cache_key(path, params):
+    # Same parameters in any order share one cache entry
+    return path, tuple(sorted((name, tuple(values)) for name, values in params.items()))
+
+
+def _split(values):
+    return [part for value in values for part in value.split(',') if part]
+
+
+def _dimensions(names):
+    unknown = [name for name in names if name not in CUBE_DIMENSIONS]
+    if unknown:
+        raise QueryError(f'unknown dimension(s): {", ".join(unknown)}')
+    return names
+
+
+def _single(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _filters(params):
+    return {dimension: list(params[dimension]) for dimension in CUBE_DIMENSIONS if dimension in params}
+
+
+class ResultCache:
+    # Least-recently-used cache of encoded responses
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'max_size': self.size}
+
+
+class QueryService:
+    def __init__(self, cube, percentiles=DEFAULT_PERCENTILES, cache_size=CACHE_SIZE):
+        self.cube = cube
+        self.percentiles = percentiles
+        self.listings = cube_listings(cube)
+        self.routes = {
+            '/query': self.query,
+            '/metro': self.metro,
+            '/airport': self.airport,
+            '/category': self.category,
+            '/health': self.health,
+        }
+        self.cache = ResultCache(cache_size)
+        # Futures of the answers being computed, by cache key
+        self.in_flight = {}
+
+        # The unfiltered /metro, /airport and /category answers for every name, encoded once
+        started = time.perf_counter()
+        tables = cube_tables(cube, percentiles)
+        self.rendered = {}
+        for path, render in [('/metro', self._metro_entries), ('/airport', self._airport_entries),
+                             ('/category', self._category_entries)]:
+            for name, entry in render(tables).items():
+                self.rendered[_cache_key(path, {'name': [name]})] = 200, _encode(entry)
+        print(f'Rendered {len(self.rendered):,} metro, airport and category answers '
+              f'in {time.perf_counter() - started:.1f}s')
+
+    def _slice(self, params, **where):
+        where = dict(_filters(params), **where)
+        return slice_cube(self.cube, **where) if where else self.cube
+
+    def query(self, params):
+        group = _dimensions(_split(params.get('group', [])))
+        if not group:
+            raise QueryError('group is required, e.g. group=closest_metro,job_category')
+
+        sort = _single(params, 'sort', 'mean')
+        if sort not in QUERY_MEASURES:
+            raise QueryError(f'sort must be one of {", ".join(QUERY_MEASURES)}')
+        ascending = _single(params, 'order', 'desc') == 'asc'
+        per = _dimensions(_split(params.get('per', [])))
+        try:
+            top = int(_single(params, 'top', 0))
+        except ValueError:
+            raise QueryError('top must be an integer')
+
+        cube = self._slice(params)
+        table = rollup(cube, group)
+        table['median'] = medians(cube, group)
+        rows = table.round(1).reset_index()
+
+        if top and per:
+            rows = top_k(rows, per, sort, top, ascending).drop(columns='rank')
+        elif top:
+            rows = rows.sort_values(sort, ascending=ascending, kind='stable').head(top)
+        return {'rows': rows.to_dict('records')}
+
+    def _rendered(self, params, dimension, render):
+        name = _single(params, 'name')
+        if not name:
+            raise QueryError('name is required')
+        cube = self._slice(params, **{dimension: name})
+        entries = render(cube_tables(cube, self.percentiles)) if not cube['cells'].empty else {}
+        if name not in entries:
+            raise QueryError(f'no listings for {name}', status=404)
+        return entries[name]
+
+    @staticmethod
+    def _metro_entries(tables):
+        return build_metro_statistics(
+            tables['metro'], tables['metro_totals'], tables['metro_within_25'], tables['metro_within_50'],
+            tables['metro_percentiles']
+        )
+
+    @staticmethod
+    def _airport_entries(tables):
+        return build_airport_statistics(tables['airport'], tables['airport_totals'], tables['airport_percentiles'])
+
+    @staticmethod
+    def _category_entries(tables):
+        city = tables['city']
+        categories = city.index.get_level_values('job_category').unique()
+        return build_category_city_stats(city, categories, tables['city_percentiles'])
+
+    def metro(self, params):
+        return self._rendered(params, 'closest_metro', self._metro_entries)
+
+    def airport(self, params):
+        return self._rendered(params, 'closest_airport', self._airport_entries)
+
+    def category(self, params):
+        return self._rendered(params, 'job_category', self._category_entries)
+
+    def health(self, params):
+        return {
+            'listings': self.listings,
+            'cells': len(self.cube['cells']),
+            'rendered': len(self.rendered),
+            'cache': self.cache.info(),
+            'in_flight': len(self.in_flight)
+        }
+
+    def _answer(self, path, params):
+        # (status, JSON body) for one request
+        try:
+            result = self.routes[path](params)
+            status = 200
+        except QueryError as error:
+            result, status = {'error': str(error)}, error.status
+        except Exception as error:
+            result, status = {'error': f'{type(error).__name__}: {error}'}, 500
+        return status, _encode(result)
+
+    async def answer(self, method, target):
+        if method not in ('GET', 'HEAD'):
+            return 405, json.dumps({'error': 'only GET is supported'}).encode('utf-8')
+
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        if path.startswith('/api/'):
+            path = path[4:]
+        if path not in self.routes:
+            return 404, json.dumps({'error': f'unknown endpoint {path}'}).encode('utf-8')
+
+        params = parse_qs(url.query)
+        if path == '/health':
+            return self._answer(path, params)
+
+        key = _cache_key(path, params)
+        response = self.rendered.get(key) or self.cache.get(key)
+        if response is not None:
+            return response
+
+        future = self.in_flight.get(key)
+        if future is None:
+            # Computed off the event loop so cached answers keep flowing meanwhile;
+            # identical requests arriving before it finishes wait for the same future
+            future = asyncio.get_running_loop().run_in_executor(None, self._answer, path, params)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        # A client that goes away doesn't cancel the answer the others are waiting for
+        return await asyncio.shield(future)
+
+    def _finished(self, key, future):
+        del self.in_flight[key]
+        if not future.cancelled() and future.result()[0] < 500:
+            self.cache.put(key, future.result())
+
+
+async def handle_connection(service, reader, writer):
+    # Minimal HTTP/1.1: one GET per request, connections kept alive until the client closes
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                status, body, method, version = 400, b'{"error": "malformed request"}', 'GET', 'HTTP/1.0'
+            else:
+                started = time.perf_counter()
+                status, body = await service.answer(method, target)
+                print(f'{method} {target} {status} {(time.perf_counter() - started) * 1000:.1f} ms')
+
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            head = (
+                f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "Error")}\r\n'
+                'Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                'Access-Control-Allow-Origin: *\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+            )
+            writer.write(head.encode('latin-1') + (body if method != 'HEAD' else b''))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(service, reader, writer), host, port)
+    print(f'Serving {service.listings:,} listings on http://{host}:{port} (open index.html?api=http://{host}:{port})')
+    async with server:
+        await server.serve_forever()
+
+
+def load_service_cube(stats_path=STATS_FILE, csv_path=LISTINGS_CSV, rebuild=False, category_mapping=None):
+    # The stored incremental statistics when they were built from the current CSV
+    # (or there is no CSV to compare with), else one pass over the CSV; either
+    # way with category_mapping's merges applied
+    if not rebuild and os.path.exists(stats_path):
+        source = load_stats_source(stats_path)
+        if not os.path.exists(csv_path) or (source and source['listings_sha256'] == listings_sha256(csv_path)):
+            print(f'Loading listing cube from {stats_path}')
+            return remap_cube(load_cube(stats_path), category_mapping)
+        print(f'{stats_path} was not built from the current {csv_path}, ignoring it '
+              f'(incremental_stats.py --rebuild updates it)')
+    print(f'Building listing cube from {csv_path}')
+    return stream_cube(csv_path, category_mapping=category_mapping)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Serve filter/group/top-k queries over the job analysis aggregates')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='interface to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--stats', default=STATS_FILE, help='stored listing cube (from incremental_stats.py)')
+    parser.add_argument('--csv', default=LISTINGS_CSV,
+                        help='listings CSV used when there is no stored cube or it is out of date')
+    parser.add_argument('--rebuild', action='store_true', help='build the cube from --csv even if a stored one is current')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='responses kept in the LRU cache')
+    parser.add_argument('--category-mapping', default=CATEGORY_MAPPING_FILE, metavar='MAPPING_CSV',
+                        help='category merges to apply, as in the dashboard (default reference/category_mapping.csv)')
+    parser.add_argument('--percentiles', type=float, nargs='+', default=DEFAULT_PERCENTILES,
+                        help='job count percentiles to report per group')
+    args = parser.parse_args(argv)
+
+    print('=== JOB ANALYSIS QUERY SERVICE ===')
+    cube = load_service_cube(args.stats, args.csv, args.rebuild, load_category_mapping(args.category_mapping))
+    service = QueryService(cube, args.percentiles, args.cache_size)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print('\nStopped')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+from geospatial import BEYOND_BAND, DISTANCE_BAND_LIMITS, haversine_miles
+from ingest import LISTINGS_CSV, listings_sha256
+from listing_cache import file_sha256
+from metro_concentration import LEGACY_WITHIN_25_BANDS, LEGACY_WITHIN_50_BANDS, metro_states, stream_metro_counts
+from reference_data import COORDINATES_FILE, city_coordinates, join_reference, metro_coordinates
+
+# Metro concentration for any radius.
+# The metro listing counts are turned into one distance-sorted table per metro,
+# with running totals of listings, distinct cities and listings per category,
+# so "how concentrated is each metro within r miles" is a binary search per
+# metro instead of a pass over the listings. City-to-metro distances come from
+# coordinates when both ends are known; otherwise the upper edge of the
+# listing's distance band is used, so band-only data gives the same answers
+# as the fixed-band analysis at 10, 25 and 50 miles ('Beyond 50 miles' rows
+# only count towards the totals). Rows without either are left out. The index
+# is saved next to the analysis (RADIUS_INDEX_FILE) so queries don't need the
+# listings at all. It records the content hashes of the listings and city
+# coordinates it was built from, and is rebuilt when either has changed.
+
+RADIUS_INDEX_FILE = 'metro_radius_index.pkl'
+
+# Distance band -> largest distance it can stand for
+BAND_MILES = {label: limit for limit, label in DISTANCE_BAND_LIMITS}
+BAND_MILES[BEYOND_BAND] = np.inf
+BAND_MILES.update({band: 25 for band in LEGACY_WITHIN_25_BANDS})
+BAND_MILES.update({band: 50 for band in LEGACY_WITHIN_50_BANDS if band not in LEGACY_WITHIN_25_BANDS})
+
+
+def listing_miles(counts, coordinates=None, metros=None):
+    # Miles from each row's city to its metro: coordinates first, band upper edge as fallback.
+    # Cities are located by (city, state) and metros by name, each with one merge.
+    coordinates = city_coordinates() if coordinates is None else coordinates
+    metros = metro_coordinates(coordinates=coordinates) if metros is None else metros
+
+    places = counts[['cleaned_city', 'cleaned_state', 'closest_metro']].astype(object).reset_index(drop=True)
+    city = join_reference(places, coordinates, 'cleaned_city', 'cleaned_state')
+    metro = places[['closest_metro']].merge(metros, how='left', left_on='closest_metro', right_index=True)
+    miles = haversine_miles(city['lat'].to_numpy(dtype=float), city['lng'].to_numpy(dtype=float),
+                            metro['lat'].to_numpy(dtype=float), metro['lng'].to_numpy(dtype=float))
+
+    band_miles = counts['metro_distance_band'].astype(object).map(BAND_MILES).astype(float).to_numpy()
+    return np.where(np.isnan(miles), band_miles, miles)
+
+
+def radius_index_source(csv=LISTINGS_CSV):
+    # What a saved index was built from: the listings (content hash) and the city coordinates
+    return {'listings': listings_sha256(csv), 'coordinates': file_sha256(COORDINATES_FILE)}
+
+
+def build_radius_index(counts, coordinates=None, source=None):
+    data = counts[counts['closest_metro'].notna()].copy()
+    data['miles'] = listing_miles(data, coordinates)
+    data = data[data['miles'].notna()]
+
+    # Listings per (metro, distance, city) with one column per category
+    by_category = data.groupby(['closest_metro', 'miles', 'cleaned_city', 'job_category'],
+                               sort=False, observed=True)['listings'].sum()
+    table = by_category.unstack('job_category', fill_value=0)
+    categories = list(table.columns)
+    table = table.reset_index().sort_values(['closest_metro', 'miles'], kind='stable')
+
+    # Ties between top categories go to the one seen first for that metro, as in top_categories_by_metro
+    category_codes = {category: code for code, category in enumerate(categories)}
+    first_seen = data.drop_duplicates(['closest_metro', 'job_category'])
+
+    metros = {}
+    for metro, rows in table.groupby('closest_metro', sort=False, observed=True):
+        listings = rows[categories].to_numpy(dtype='int64')
+        seen = first_seen.loc[first_seen['closest_metro'] == metro, 'job_category'].map(category_codes)
+        tie_order = np.full(len(categories), len(categories))
+        tie_order[seen.to_numpy(dtype=int)] = np.arange(len(seen))
+        metros[metro] = {
+            'miles': rows['miles'].to_numpy(),
+            'listings': listings.sum(axis=1).cumsum(),
+            'cities': (~rows['cleaned_city'].duplicated()).to_numpy().cumsum(),
+            'categories': listings.cumsum(axis=0),
+            'tie_order': tie_order,
+        }
+
+    return {
+        'source': source,
+        'categories': categories,
+        'states': metro_states(counts),
+        'metros': metros,
+    }
+
+
+def _top_categories(category_listings, tie_order, categories, top_n):
+    order = np.lexsort((tie_order, -category_listings))
+    return [(categories[i], int(category_listings[i])) for i in order[:top_n] if category_listings[i] > 0]
+
+
+def radius_concentration(index, radius, top_n=3):
+    # Share of each metro's listings within radius miles, plus cities and top categories in that radius
+    categories = index['categories']
+    results = {}
+    for metro, data in index['metros'].items():
+        total = int(data['listings'][-1])
+        position = np.searchsorted(data['miles'], radius, side='right')
+        within = int(data['listings'][position - 1]) if position else 0
+        cities = int(data['cities'][position - 1]) if position else 0
+        category_listings = data['categories'][position - 1] if position else np.zeros(len(categories), dtype='int64')
+
+        results[metro] = {
+            'state': index['states'].get(metro, 'Unknown'),
+            'radius_miles': radius,
+            'total_listings': total,
+            'within_radius_listings': within,
+            'concentration_percentage': round(within / total * 100, 1) if total > 0 else 0,
+            'unique_cities': cities,
+            'top_categories': _top_categories(category_listings, data['tie_order'], categories, top_n)
+        }
+
+    return dict(sorted(results.items(), key=lambda item: item[1]['total_listings'], reverse=True))
+
+
+def radius_state_concentration(metro_results):
+    states = {}
+    for metro, data in metro_results.items():
+        state = states.setdefault(data['state'], {'metros': [], 'total_listings': 0, 'within_radius_listings': 0})
+        state['metros'].append(metro)
+        state['total_listings'] += data['total_listings']
+        state['within_radius_listings'] += data['within_radius_listings']
+
+    for data in states.values():
+        data['concentration_percentage'] = round(
+            data['within_radius_listings'] / data['total_listings'] * 100, 1
+        ) if data['total_listings'] > 0 else 0
+    return states
+
+
+def save_radius_index(index, path=RADIUS_INDEX_FILE):
+    with open(path, 'wb') as f:
+        pickle.dump(index, f)
+
+
+def load_radius_index(path=RADIUS_INDEX_FILE):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Metro job concentration within any radius')
+    parser.add_argument('radius', type=float, nargs='+', help='radius in miles (several allowed)')
+    parser.add_argument('--index', default=RADIUS_INDEX_FILE, help='saved radius index')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild the index from --csv first')
+    parser.add_argument('--csv', default=LISTINGS_CSV, help='listings CSV used to build the index')
+    parser.add_argument('--top', type=int, default=3, help='top categories to list per metro')
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    source = radius_index_source(args.csv)
+    index = None
+    if not args.rebuild and os.path.exists(args.index):
+        index = load_radius_index(args.index)
+        if index.get('source') != source:
+            print(f'{args.index} was built from other listings or coordinates than {args.csv}')
+            index = None
+    if index is None:
+        print(f'Building radius index from {args.csv}')
+        index = build_radius_index(stream_metro_counts(args.csv), source=source)
+        save_radius_index(index, args.index)
+
+    results = {}
+    for radius in args.radius:
+        started = time.perf_counter()
+        metros = radius_concentration(index, radius, args.top)
+        states = radius_state_concentration(metros)
+        elapsed = (time.perf_counter() - started) * 1000
+        results[f'{radius:g}'] = {'metros': metros, 'states': states}
+
+        print(f'\n=== METRO CONCENTRATION WITHIN {radius:g} MILES ({elapsed:.1f} ms) ===')
+        for metro, data in metros.items():
+            top = ', '.join(f'{category} ({listings:,})' for category, listings in data['top_categories'])
+            print(f'{metro}: {data["concentration_percentage"]}% ({data["within_radius_listings"]:,}/'
+                  f'{data["total_listings"]:,} listings, {data["unique_cities"]} cities) - {top}')
+        for state, data in sorted(states.items()):
+            print(f'  {state}: {data["concentration_percentage"]}% across {len(data["metros"])} metros')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\n✅ Saved radius concentration to {args.json}')
+
+
+if __name__ == '__main__':
+    main()
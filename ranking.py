@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Top-k per group over an aggregate table.
+# One stable sort on the ranking metric(s) followed by a stable sort on the
+# group's first-appearance number puts every group's rows in rank order in a
+# single pass; ranks are then positions within each group's run. Ties keep the
+# table's row order, exactly like Python's stable sorted(..., reverse=True)
+# over the same items, so sections that used to sort dict items per group come
+# out identical.
+
+
+def nested_table(data, keys, value_columns=None):
+    # {a: {b: {field: value}}} -> DataFrame with columns keys + fields, in dict order
+    if value_columns is None:
+        leaf = data
+        for _ in keys:
+            leaf = next(iter(leaf.values()), {})
+        value_columns = list(leaf)
+
+    rows = []
+
+    def walk(node, prefix):
+        if len(prefix) == len(keys):
+            rows.append(prefix + [node.get(column) for column in value_columns])
+            return
+        for key, child in node.items():
+            walk(child, prefix + [key])
+
+    walk(data, [])
+    return pd.DataFrame(rows, columns=list(keys) + list(value_columns))
+
+
+def top_k(table, by, metric, k, ascending=False):
+    # The k best rows of every group of `by`, with a 1-based 'rank' column.
+    # metric/ascending may be lists; later metrics break ties in earlier ones.
+    metrics = [metric] if isinstance(metric, str) else list(metric)
+    directions = [ascending] * len(metrics) if isinstance(ascending, bool) else list(ascending)
+
+    sort_keys = []
+    for column, asc in zip(reversed(metrics), reversed(directions)):
+        values = table[column].to_numpy(dtype=float)
+        sort_keys.append(values if asc else -values)
+    order = np.lexsort(sort_keys) if sort_keys else np.arange(len(table))
+
+    groups = table.groupby(by, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    order = order[np.argsort(groups[order], kind='stable')]
+
+    ordered_groups = groups[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(ordered_groups)) + 1] if len(order) else np.array([], dtype=int)
+    run_start = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    rank = np.arange(len(order)) - run_start + 1
+
+    keep = rank <= k
+    ranked = table.iloc[order[keep]].copy()
+    ranked['rank'] = rank[keep]
+    return ranked
+
+
+def ranked_lists(ranked, by, fields, rank_field='rank'):
+    # {group: [{rank_field: 1, name: value, ...}, ...]} from top_k output, in rank order;
+    # fields maps output names to columns, rank_field=None leaves the rank out
+    key_columns = [by] if isinstance(by, str) else list(by)
+    keys = list(zip(*(ranked[column].tolist() for column in key_columns)))
+    names = ([rank_field] if rank_field else []) + list(fields)
+    columns = ([ranked['rank'].tolist()] if rank_field else []) + [ranked[column].tolist() for column in fields.values()]
+
+    lists = {}
+    for key, values in zip(keys, zip(*columns)):
+        lists.setdefault(key[0] if len(key_columns) == 1 else key, []).append(dict(zip(names, values)))
+    return lists
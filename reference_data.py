@@ -0,0 +1,83 @@
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+# Reference tables about places: populations, coordinates and the major metro centers.
+# Each table is a CSV file under reference/ with city and state columns and is
+# loaded once into a frame indexed by (city, state), so same-named cities in
+# different states (Smyrna GA/TN, Mesquite TX/NV) stay apart and a full Census
+# place table can be dropped in place of a file. Aggregates pick up reference
+# columns with one merge on (city, state) (join_reference) instead of a
+# dictionary lookup per city.
+#
+# Output that is still keyed by bare city name uses the by-name views, where
+# the last row of a repeated name wins (as it did in the old dictionaries).
+# Airports (airports.csv) are keyed by IATA code instead, with their state as
+# a column.
+
+REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference')
+POPULATIONS_FILE = os.path.join(REFERENCE_DIR, 'city_populations.csv')
+COORDINATES_FILE = os.path.join(REFERENCE_DIR, 'city_coordinates.csv')
+MAJOR_METROS_FILE = os.path.join(REFERENCE_DIR, 'major_metros.csv')
+AIRPORTS_FILE = os.path.join(REFERENCE_DIR, 'airports.csv')
+
+REFERENCE_KEYS = ['city', 'state']
+
+
+@lru_cache(maxsize=None)
+def load_reference(path):
+    # (city, state)-indexed frame of one reference file; repeated places keep their last row
+    table = pd.read_csv(path, dtype={'city': str, 'state': str}).set_index(REFERENCE_KEYS)
+    return table[~table.index.duplicated(keep='last')]
+
+
+def city_populations(path=POPULATIONS_FILE):
+    return load_reference(path)
+
+
+def city_coordinates(path=COORDINATES_FILE):
+    return load_reference(path)
+
+
+def major_metros(path=MAJOR_METROS_FILE):
+    return load_reference(path)
+
+
+@lru_cache(maxsize=None)
+def airport_coordinates(path=AIRPORTS_FILE):
+    # Main commercial airports of the covered states: lat/lng and state by IATA code, in file order
+    return pd.read_csv(path, dtype={'airport': str, 'state': str}).set_index('airport')
+
+
+def metro_coordinates(metros=None, coordinates=None):
+    # Metro name -> lat/lng of its center city, in metro name order
+    metros = major_metros() if metros is None else metros
+    coordinates = city_coordinates() if coordinates is None else coordinates
+    located = join_reference(metros.index.to_frame(index=False), coordinates, how='inner')
+    return located.set_index('city')[['lat', 'lng']].sort_index()
+
+
+def join_reference(frame, reference, city='city', state='state', how='left'):
+    # frame with the reference columns of its (city, state) pairs, rows in frame order
+    columns = reference.reset_index().rename(columns={'city': city, 'state': state})
+    return frame.merge(columns, how=how, on=[city, state])
+
+
+def in_reference(frame, reference, city='city', state='state'):
+    # Boolean array: which rows' (city, state) pairs the reference lists
+    return pd.MultiIndex.from_frame(frame[[city, state]]).isin(reference.index)
+
+
+def by_name(reference, columns):
+    # {city: value} (or {city: [values]} for several columns); a repeated name keeps its last row
+    table = reference.reset_index()
+    if isinstance(columns, str):
+        return dict(zip(table['city'], table[columns].tolist()))
+    return dict(zip(table['city'], table[columns].to_numpy().tolist()))
+
+
+def metro_names(metros=None):
+    # Major metro center names in file order
+    metros = major_metros() if metros is None else metros
+    return metros.index.get_level_values('city').tolist()
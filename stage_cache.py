@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import pickle
+from functools import lru_cache
+from glob import glob
+
+from listing_cache import file_sha256
+
+# Content-addressed cache of pipeline stage outputs.
+# Every pipeline stage declares what it reads besides the analysis handed to
+# it: the listings (by the content hash of the CSV and the ingest options),
+# reference tables (by file hash) and parameters such as top-k counts or
+# percentiles. A stage's key hashes those inputs together with the content
+# digest of the analysis it starts from and a digest of the pipeline code, and
+# the analysis it produces is stored under that key next to its own content
+# digest, which goes into the key of the stage after it. So a rerun only
+# recomputes the stages whose inputs changed, and a stage that recomputes to
+# the same output as before leaves the stages after it cached. The listing
+# cube is kept the same way under the listings key, so a rerun that only
+# touches a later stage never reads the listings.
+#
+# Any change to a .py file next to this one changes the code digest and so
+# every key; parameters meant to be tweaked between runs are pipeline options.
+
+STAGE_CACHE_DIR = '.stage_cache'
+CACHE_ENTRIES_PER_STAGE = 8
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def digest(value):
+    # Content hash of a JSON-serializable value, key order included
+    text = json.dumps(value, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _file_digest(path, size, mtime_ns):
+    return file_sha256(path)
+
+
+def file_digest(path):
+    # Content hash of a file, hashed once per version of the file
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def code_digest(directory=CODE_DIR):
+    return digest({os.path.basename(path): file_digest(path)
+                   for path in sorted(glob(os.path.join(directory, '*.py')))})
+
+
+class StageCache:
+    def __init__(self, directory=STAGE_CACHE_DIR, keep=CACHE_ENTRIES_PER_STAGE):
+        self.directory = directory
+        self.keep = keep
+        self.code = code_digest()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, name, inputs, analysis_digest=None):
+        return digest({'stage': name, 'code': self.code, 'analysis': analysis_digest, 'inputs': inputs})
+
+    def _path(self, name, key, suffix):
+        return os.path.join(self.directory, f'{name}-{key}{suffix}')
+
+    def lookup(self, name, key):
+        # Output digest of a cached entry, or None on a miss
+        path = self._path(name, key, '.json')
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._path(name, key, '.pkl')):
+            return None
+        os.utime(path)
+        return entry['output']
+
+    def load(self, name, key):
+        with open(self._path(name, key, '.pkl'), 'rb') as f:
+            return pickle.load(f)
+
+    def store(self, name, key, value, inputs=None, output_digest=None):
+        # Write the value, then its entry (written last, so a half-written value is never found)
+        output_digest = digest(value) if output_digest is None else output_digest
+        path = self._path(name, key, '.pkl')
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+        path = self._path(name, key, '.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'stage': name, 'inputs': inputs, 'output': output_digest}, f, indent=2, default=str)
+        os.replace(path + '.tmp', path)
+        self._prune(name)
+        return output_digest
+
+    def cached(self, name, key, build):
+        # build()'s value for key, built and stored only on a miss
+        if self.lookup(name, key) is not None:
+            print(f'Using cached {name} {key[:12]}')
+            return self.load(name, key)
+        value = build()
+        # Entries that are not analysis sections are addressed by their key alone
+        self.store(name, key, value, output_digest=key)
+        return value
+
+    def _prune(self, name):
+        # Keep the most recently used entries of each stage
+        entries = sorted(glob(self._path(name, '*', '.json')), key=os.path.getmtime, reverse=True)
+        for path in entries[self.keep:]:
+            for stale in (path, path[:-len('.json')] + '.pkl'):
+                if os.path.exists(stale):
+                    os.remove(stale)
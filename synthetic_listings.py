@@ -0,0 +1,158 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from geospatial import distance_band, haversine_miles
+from reference_data import city_coordinates, city_populations, join_reference, metro_coordinates
+
+# Synthetic listings shaped like key_categories_job_analysis.csv.
+# Category and state mixes follow Job_Analysis_Summary_Report.md, listings per
+# city follow population, real cities keep their own state and take the
+# airport of their nearest major metro (within 150 miles) and the rest of the
+# city list is made up of towns scattered around the metros. Used by benchmark.py to time the
+# analysis at sizes we don't have real data for.
+
+CATEGORY_SHARES = {
+    'Registered Nurse': 12.3, 'Other': 10.8, 'HVAC Technician': 9.9, 'Security Guard': 9.1,
+    'CDL Driver': 9.1, 'Electrician': 8.2, 'Welder': 7.7, 'Dental Assistant': 7.3,
+    'Aviation Mechanic': 6.2, 'Veterinary Assistant': 5.9, 'Licensed Practical Nurse': 4.5,
+    'Home Health Aide': 3.8, 'Plumber': 2.9, 'Pharmacy Technician': 2.3
+}
+
+STATE_SHARES = {'FL': 21.9, 'TX': 20.5, 'GA': 15.8, 'NC': 15.2, 'TN': 12.1, 'AZ': 9.6, 'NV': 4.9}
+
+METRO_STATES = {
+    'Houston': 'TX', 'Dallas': 'TX', 'Austin': 'TX', 'Fort Worth': 'TX', 'San Antonio': 'TX',
+    'Miami': 'FL', 'Tampa': 'FL', 'Orlando': 'FL', 'Jacksonville': 'FL', 'Atlanta': 'GA',
+    'Charlotte': 'NC', 'Raleigh': 'NC', 'Greensboro': 'NC', 'Durham': 'NC', 'Winston-Salem': 'NC',
+    'Phoenix': 'AZ', 'Tucson': 'AZ', 'Nashville': 'TN', 'Memphis': 'TN', 'Las Vegas': 'NV'
+}
+
+METRO_AIRPORTS = {
+    'Houston': 'IAH', 'Dallas': 'DFW', 'Austin': 'AUS', 'Fort Worth': 'DFW', 'San Antonio': 'SAT',
+    'Miami': 'MIA', 'Tampa': 'TPA', 'Orlando': 'MCO', 'Jacksonville': 'JAX', 'Atlanta': 'ATL',
+    'Charlotte': 'CLT', 'Raleigh': 'RDU', 'Greensboro': 'GSO', 'Durham': 'RDU', 'Winston-Salem': 'GSO',
+    'Phoenix': 'PHX', 'Tucson': 'TUS', 'Nashville': 'BNA', 'Memphis': 'MEM', 'Las Vegas': 'LAS'
+}
+
+TITLE_PREFIXES = ['', 'Senior', 'Lead', 'Travel', 'Entry Level', 'Certified', 'PRN', 'Night Shift', 'Apprentice']
+TITLES_PER_CATEGORY = 700
+
+MAX_METRO_MILES = 150
+MISSING_GEOGRAPHY_SHARE = 0.01
+CHUNK_ROWS = 1_000_000
+
+
+def build_cities(rng, city_count):
+    metro_points = metro_coordinates()
+    metros = metro_points.index.tolist()
+    metro_lat = metro_points['lat'].to_numpy()
+    metro_lng = metro_points['lng'].to_numpy()
+
+    # Real cities, attached to their nearest major metro
+    places = join_reference(city_coordinates().reset_index(), city_populations())
+    lat = places['lat'].to_numpy()
+    lng = places['lng'].to_numpy()
+    distances = haversine_miles(lat[:, None], lng[:, None], metro_lat[None, :], metro_lng[None, :])
+    nearest = distances.argmin(axis=1)
+    miles = distances[np.arange(len(places)), nearest]
+    near = miles <= MAX_METRO_MILES
+
+    real = pd.DataFrame({
+        'cleaned_city': places['city'].to_numpy()[near],
+        'closest_metro': np.array(metros)[nearest[near]],
+        'miles': miles[near],
+        'population': places['population'].fillna(50_000).to_numpy()[near],
+        'cleaned_state': places['state'].to_numpy()[near],
+    })
+
+    # Made-up towns around the metros, spread across states by listing share
+    town_count = max(city_count - len(real), 0)
+    metros_per_state = pd.Series(METRO_STATES).value_counts()
+    metro_weights = np.array([
+        STATE_SHARES[METRO_STATES[metro]] / metros_per_state[METRO_STATES[metro]] for metro in metros
+    ])
+    towns = pd.DataFrame({
+        'cleaned_city': [f'Town {i}' for i in range(town_count)],
+        'closest_metro': rng.choice(metros, size=town_count, p=metro_weights / metro_weights.sum()),
+        'miles': rng.gamma(2.0, 20.0, size=town_count),
+        'population': rng.lognormal(np.log(15_000), 1.0, size=town_count),
+    })
+    towns['cleaned_state'] = towns['closest_metro'].map(METRO_STATES)
+
+    cities = pd.concat([real, towns], ignore_index=True)
+    cities['closest_airport'] = cities['closest_metro'].map(METRO_AIRPORTS)
+    cities['metro_distance_band'] = distance_band(cities['miles'].to_numpy())
+
+    missing = rng.random(len(cities)) < MISSING_GEOGRAPHY_SHARE
+    cities.loc[missing, ['closest_metro', 'closest_airport', 'metro_distance_band']] = np.nan
+
+    # Listings per city follow population, scaled so state totals match STATE_SHARES
+    weight = cities['population'] ** 0.8
+    weight = weight / weight.groupby(cities['cleaned_state']).transform('sum')
+    cities['weight'] = weight * cities['cleaned_state'].map(STATE_SHARES)
+    cities['weight'] /= cities['weight'].sum()
+    return cities.drop(columns=['miles', 'population'])
+
+
+def build_titles():
+    titles = {}
+    for category in CATEGORY_SHARES:
+        named = [f'{prefix} {category}'.strip() for prefix in TITLE_PREFIXES]
+        numbered = [f'{category} {i}' for i in range(TITLES_PER_CATEGORY - len(named))]
+        titles[category] = np.array(named + numbered, dtype=object)
+    return titles
+
+
+def generate_listings(rng, rows, cities, titles):
+    categories = np.array(list(CATEGORY_SHARES), dtype=object)
+    shares = np.array(list(CATEGORY_SHARES.values()))
+    category_index = rng.choice(len(categories), size=rows, p=shares / shares.sum())
+    city_index = rng.choice(len(cities), size=rows, p=cities['weight'].to_numpy())
+
+    # Zipf-like title popularity within each category
+    ranks = np.arange(1, TITLES_PER_CATEGORY + 1)
+    title_p = 1 / ranks ** 1.1
+    title_index = rng.choice(TITLES_PER_CATEGORY, size=rows, p=title_p / title_p.sum())
+    title_table = np.stack([titles[category] for category in categories])
+
+    # Jobs per search: log-normal around a per-category median (overall mean ~290)
+    medians = 120 + 260 * (np.arange(len(categories)) % 5) / 4
+    job_count = rng.lognormal(np.log(medians[category_index]), 0.7).round().clip(1, 5000).astype('int64')
+
+    geography = cities.iloc[city_index]
+    return pd.DataFrame({
+        'extracted_job_title': title_table[category_index, title_index],
+        'job_category': categories[category_index],
+        'cleaned_city': geography['cleaned_city'].to_numpy(),
+        'cleaned_state': geography['cleaned_state'].to_numpy(),
+        'closest_metro': geography['closest_metro'].to_numpy(),
+        'closest_airport': geography['closest_airport'].to_numpy(),
+        'metro_distance_band': geography['metro_distance_band'].to_numpy(),
+        'job_count': job_count,
+    })
+
+
+def write_synthetic_listings(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    # Written in chunks so even the largest sizes never sit in memory at once
+    rng = np.random.default_rng(seed)
+    city_count = int(min(6_000, max(300, rows / 30)))
+    cities = build_cities(rng, city_count)
+    titles = build_titles()
+
+    for start in range(0, rows, chunk_rows):
+        chunk = generate_listings(rng, min(chunk_rows, rows - start), cities, titles)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic key_categories_job_analysis.csv')
+    parser.add_argument('rows', type=int, help='number of listings to generate')
+    parser.add_argument('--output', default='key_categories_job_analysis.csv', help='CSV to write')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    write_synthetic_listings(args.output, args.rows, args.seed)
+    print(f'✅ Wrote {args.rows:,} synthetic listings to {args.output}')
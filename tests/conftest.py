@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic_listings import build_cities, build_titles, generate_listings
+
+LISTING_ROWS = 6_000
+
+
+@pytest.fixture(scope='session')
+def listings():
+    # Synthetic listings shaped like the CSV, a few of them without a job count
+    rng = np.random.default_rng(0)
+    df = generate_listings(rng, LISTING_ROWS, build_cities(rng, 300), build_titles())
+    df['job_count'] = df['job_count'].astype('Int64')
+    df.loc[df.index % 97 == 0, 'job_count'] = pd.NA
+    return df
+
+
+@pytest.fixture(scope='session')
+def analysis(listings):
+    from pipeline import analyze_listings
+    return analyze_listings(listings)
+
+
+@pytest.fixture(scope='session')
+def listings_csv(listings, tmp_path_factory):
+    # The synthetic listings written out as key_categories_job_analysis.csv
+    path = tmp_path_factory.mktemp('listings') / 'key_categories_job_analysis.csv'
+    listings.to_csv(path, index=False)
+    return str(path)
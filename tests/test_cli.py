@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def test_cli_imports_without_pandas():
+    assert run_python('import sys, cli; print("pandas" in sys.modules)').stdout.strip() == 'False'
+
+
+def test_help_lists_the_commands_without_pandas():
+    result = run_python(
+        'import atexit, sys, cli\n'
+        'atexit.register(lambda: print("pandas" in sys.modules))\n'
+        'cli.main(["--help"])\n'
+    )
+    assert result.stdout.splitlines()[-1] == 'False'
+    assert all(name in result.stdout for name in cli.COMMANDS)
+
+
+def test_commands_pass_their_options_and_arguments(monkeypatch):
+    calls = []
+    module = types.SimpleNamespace(main=lambda argv, prog, **options: calls.append((argv, prog, options)))
+    monkeypatch.setattr(cli, 'import_module', lambda name: calls.append(name) or module)
+
+    cli.main(['concentration', '--output', 'out.json', '--no-cache'])
+    assert calls[0] == 'pipeline'
+    argv, prog, options = calls[1]
+    assert argv == ['--output', 'out.json', '--no-cache'] and options == {'stages': ['concentration']}
+    assert prog.endswith(' concentration')
+
+    calls.clear()
+    cli.main(['serve', '--port', '0'])
+    assert calls[0] == 'query_service' and calls[1][0] == ['--port', '0'] and calls[1][2] == {}
+    with pytest.raises(SystemExit):
+        cli.main(['planet'])
+
+
+def load_analysis(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_stage_commands_build_on_the_written_analysis(listings_csv, tmp_path, monkeypatch):
+    # Dashboard shards are written next to the working directory
+    monkeypatch.chdir(tmp_path)
+    output = str(tmp_path / 'analysis.json')
+    common = ['--csv', listings_csv, '--output', output, '--no-cache', '--chunksize', '2000']
+    cli.main(['stats'] + common)
+    statistics = load_analysis(output)
+    assert 'category_overview' in statistics and 'enhanced_analysis' not in statistics
+
+    # concentration fills in the enhanced_analysis section the enhanced stage adds
+    cli.main(['enhanced'] + common)
+    cli.main(['concentration'] + common)
+    analysis = load_analysis(output)
+    assert analysis['category_overview'] == statistics['category_overview']
+    assert analysis['enhanced_analysis']['state_metro_concentration']
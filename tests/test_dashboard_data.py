@@ -0,0 +1,91 @@
+import gzip
+import json
+import math
+import os
+
+from dashboard_data import MANIFEST_FILE, TABLE_MARKER, compact_value, write_dashboard_shards
+
+
+def decode_compact(value):
+    # Python twin of decodeCompact in index.html
+    if isinstance(value, list):
+        return [decode_compact(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if TABLE_MARKER not in value:
+        return {key: decode_compact(item) for key, item in value.items()}
+
+    table = value[TABLE_MARKER]
+    columns = [[decode_compact(item) for item in column] for column in table['columns']]
+    records = [dict(zip(table['fields'], row)) for row in zip(*columns)]
+    if 'keys' not in table:
+        return records
+    return {str(key): record for key, record in zip(table['keys'], records)}
+
+
+def as_json(value):
+    # What the full JSON file reads back as, with NaN written as null like the compact shards do
+    def without_nan(item):
+        if isinstance(item, float) and math.isnan(item):
+            return None
+        if isinstance(item, dict):
+            return {key: without_nan(child) for key, child in item.items()}
+        if isinstance(item, list):
+            return [without_nan(child) for child in item]
+        return item
+    return without_nan(json.loads(json.dumps(value)))
+
+
+def merge_into(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_into(target[key], value)
+        else:
+            assert key not in target or target[key] == value, key
+            target[key] = value
+    return target
+
+
+def test_compact_value_round_trip(analysis):
+    compact = json.loads(json.dumps(compact_value(analysis)))
+    assert decode_compact(compact) == as_json(analysis)
+
+
+def test_compact_tables():
+    records = {'a': {'x': 1, 'y': 2.5}, 'b': {'x': 3, 'y': float('nan')}}
+    mixed = [{'x': 1}, {'y': 2}]
+    compact = compact_value({'records': records, 'mixed': mixed, 'list': [{'x': 1}, {'x': 2}]})
+    assert compact['records'] == {TABLE_MARKER: {'fields': ['x', 'y'], 'columns': [[1, 3], [2.5, None]],
+                                                 'keys': ['a', 'b']}}
+    assert compact['mixed'] == mixed
+    assert compact['list'] == {TABLE_MARKER: {'fields': ['x'], 'columns': [[1, 2]]}}
+
+
+def test_shards_merge_back_to_full_analysis(analysis, tmp_path):
+    manifest = write_dashboard_shards(analysis, str(tmp_path))
+    with open(tmp_path / MANIFEST_FILE) as f:
+        assert json.load(f) == manifest
+
+    files = (list(manifest['shards'].values()) + list(manifest['city_breakdown'].values())
+             + list(manifest['map_levels'].values()))
+    merged = {}
+    for name in files:
+        path = os.path.join(tmp_path, name)
+        with open(path) as f:
+            merge_into(merged, decode_compact(json.load(f)))
+
+    full = as_json(analysis)
+    # The cluster summary stays in the full file; the map shards carry the levels
+    map_clusters = full['enhanced_analysis']['map_clusters']
+    merged['enhanced_analysis']['map_clusters'].update(
+        {key: value for key, value in map_clusters.items() if key != 'levels'}
+    )
+    assert merged == full
+
+
+def test_shards_are_precompressed(analysis, tmp_path):
+    manifest = write_dashboard_shards(analysis, str(tmp_path))
+    for name in manifest['shards'].values():
+        path = os.path.join(tmp_path, name)
+        with open(path, 'rb') as f, open(path + '.gz', 'rb') as compressed:
+            assert gzip.decompress(compressed.read()) == f.read()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geospatial import (
+    AIRPORT_COORDINATES, METRO_COORDINATES, GridIndex, assign_listing_geography, distance_band, haversine_miles
+)
+from reference_data import airport_coordinates
+
+
+def brute_force(points, lat, lng):
+    names = np.array(list(points), dtype=object)
+    coords = np.array(list(points.values()))
+    distances = haversine_miles(lat[:, None], lng[:, None], coords[None, :, 0], coords[None, :, 1])
+    return names[distances.argmin(axis=1)], distances.min(axis=1)
+
+
+@pytest.mark.parametrize('points', [METRO_COORDINATES, AIRPORT_COORDINATES], ids=['metros', 'airports'])
+@pytest.mark.parametrize('cell_degrees', [0.25, 1.0, 5.0])
+def test_nearest_matches_brute_force(points, cell_degrees):
+    rng = np.random.default_rng(0)
+    lat, lng = rng.uniform(24, 40, 3_000), rng.uniform(-120, -75, 3_000)
+    names, miles = GridIndex(points, cell_degrees).nearest(lat, lng)
+    expected_names, expected_miles = brute_force(points, lat, lng)
+    assert (names == expected_names).all()
+    np.testing.assert_allclose(miles, expected_miles)
+
+
+def test_missing_coordinates_and_empty_index():
+    names, miles = GridIndex(METRO_COORDINATES).nearest([np.nan, 29.76], [-95.37, np.nan])
+    assert pd.isna(names).all() and np.isnan(miles).all()
+    names, miles = GridIndex({}).nearest([29.76], [-95.37])
+    assert pd.isna(names).all() and np.isnan(miles).all()
+
+
+def test_airports_load_from_the_reference_table():
+    airports = airport_coordinates()
+    assert list(AIRPORT_COORDINATES) == airports.index.tolist()
+    assert AIRPORT_COORDINATES['ATL'] == [airports.at['ATL', 'lat'], airports.at['ATL', 'lng']]
+    assert set(airports['state']) == {'TX', 'FL', 'GA', 'NC', 'AZ', 'TN', 'NV'}
+
+
+def test_listing_geography_is_derived_per_place():
+    df = pd.DataFrame({
+        'cleaned_city': ['Houston', 'Nowhere', 'Dallas', 'Houston'],
+        'cleaned_state': ['TX', 'TX', 'TX', 'TX'],
+        'closest_metro': ['Old', 'Kept', 'Old', 'Old'],
+    })
+    result = assign_listing_geography(
+        df, GridIndex(METRO_COORDINATES), GridIndex(AIRPORT_COORDINATES)
+    )
+    assert result['closest_metro'].tolist() == ['Houston', 'Kept', 'Dallas', 'Houston']
+    assert result['metro_distance_band'].tolist()[::2] == ['Within Metro', 'Within Metro']
+    assert result['closest_airport'].iloc[0] in {'IAH', 'HOU'}
+    assert list(distance_band([5, 20, 40, 80])) == ['Within Metro', 'Within 25 miles', 'Within 50 miles',
+                                                    'Beyond 50 miles']
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+from ingest import CATEGORY_COLUMNS, read_listing_chunks, read_listings
+from listing_cube import build_cube, cube_listings, medians, rollup, stream_cube
+
+
+def test_chunks_cover_the_csv_with_typed_columns(listings_csv, listings):
+    chunks = list(read_listing_chunks(listings_csv, 1_000, use_cache=False))
+    assert [len(chunk) for chunk in chunks] == [1_000] * 6
+    for chunk in chunks:
+        assert str(chunk['job_count'].dtype) == 'Int64'
+        assert all(isinstance(chunk[column].dtype, pd.CategoricalDtype) for column in CATEGORY_COLUMNS)
+
+    df = pd.concat(chunks, ignore_index=True)
+    # Blank job counts read back as missing, not as a parse error or zero
+    assert_series_equal(df['job_count'], listings['job_count'])
+    assert (df['cleaned_city'].astype(object) == listings['cleaned_city']).all()
+
+
+def plain(table):
+    # Groups as plain values, however the keys were typed
+    table = table.reset_index()
+    return table.astype({column: object for column in table.columns if table[column].dtype.kind not in 'fiu'})
+
+
+@pytest.mark.parametrize('chunksize', [700, 2_500, 10_000])
+def test_streamed_cube_matches_one_pass(listings_csv, listings, chunksize):
+    streamed, whole = stream_cube(listings_csv, chunksize, use_cache=False), build_cube(listings)
+    assert cube_listings(streamed) == len(listings)
+    for keys in [['job_category'], ['cleaned_state', 'job_category'], ['job_category', 'cleaned_city']]:
+        assert_frame_equal(plain(rollup(streamed, keys, sort=True)), plain(rollup(whole, keys, sort=True)))
+        assert_frame_equal(plain(medians(streamed, keys).sort_index()), plain(medians(whole, keys).sort_index()))
+
+
+def test_cached_keys_are_categoricals_sharing_one_lookup(listings_csv, listings):
+    chunks = list(read_listing_chunks(listings_csv, 2_500))
+    for column in CATEGORY_COLUMNS:
+        dtypes = {chunk[column].dtype for chunk in chunks}
+        assert len(dtypes) == 1
+        categories = dtypes.pop().categories
+        assert list(categories) == sorted(listings[column].dropna().unique())
+
+    # One lookup table, so the chunks concatenate without decoding
+    df = pd.concat(chunks, ignore_index=True)
+    assert isinstance(df['cleaned_state'].dtype, pd.CategoricalDtype)
+    assert (df['cleaned_state'].astype(object) == listings['cleaned_state']).all()
+    assert not isinstance(df['extracted_job_title'].dtype, pd.CategoricalDtype)
+
+
+def test_missing_keys_stay_missing(tmp_path):
+    path = tmp_path / 'listings.csv'
+    path.write_text(
+        'extracted_job_title,job_category,cleaned_city,cleaned_state,closest_metro,closest_airport,'
+        'metro_distance_band,job_count\n'
+        'Welder,Welder,Tulsa,OK,,,,7\n'
+        'Welder,Welder,Dallas,TX,Dallas,DFW,Within Metro,\n'
+    )
+    for use_cache in [True, False]:
+        df = read_listings(str(path), use_cache=use_cache)
+        assert df['closest_metro'].isna().tolist() == [True, False]
+        assert list(df['closest_metro'].cat.categories) == ['Dallas']
+        assert df['job_count'].isna().tolist() == [False, True]
@@ -0,0 +1,51 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import listing_cache
+from ingest import LISTING_DTYPES, listing_cache as open_cache, read_listing_chunks, read_listings
+
+
+@pytest.fixture
+def csv(listings_csv, tmp_path):
+    # A private copy, so each test starts without a cache
+    path = tmp_path / 'listings.csv'
+    shutil.copy(listings_csv, path)
+    return str(path)
+
+
+def no_rebuild(monkeypatch):
+    def fail(path, chunks):
+        raise AssertionError(f'cache for {path} rebuilt')
+    monkeypatch.setattr(listing_cache, 'write_listing_cache', fail)
+
+
+def test_cached_rows_match_the_csv(csv):
+    # Text columns compared as plain objects; job counts come back as floats with NaN for the blanks
+    expected = pd.read_csv(csv, dtype=LISTING_DTYPES).astype({'job_count': 'float64'})
+    cached = read_listings(csv).astype({column: object for column in expected.columns if column != 'job_count'})
+    assert_frame_equal(cached, expected)
+
+    chunks = list(read_listing_chunks(csv, 2_500, columns=['job_category', 'job_count']))
+    assert [len(chunk) for chunk in chunks] == [2_500, 2_500, 1_000]
+    assert list(chunks[0].columns) == ['job_category', 'job_count']
+
+
+def test_cache_is_reused_until_the_csv_changes(csv, monkeypatch):
+    manifest = open_cache(csv)
+    assert manifest['rows'] == 6_000
+
+    with monkeypatch.context() as patch:
+        no_rebuild(patch)
+        open_cache(csv)
+        # Touched but unchanged: the content hash keeps the cache
+        os.utime(csv, ns=(manifest['source']['mtime_ns'] + 10**9,) * 2)
+        assert open_cache(csv)['source']['sha256'] == manifest['source']['sha256']
+
+    with open(csv, 'a') as f:
+        f.write('Welder 1,Welder,Tulsa,OK,,,,7\n')
+    assert open_cache(csv)['rows'] == 6_001
+    assert read_listings(csv)['cleaned_city'].iloc[-1] == 'Tulsa'
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+from listing_cube import CUBE_DIMENSIONS, build_cube, medians, merge_cubes, rollup, slice_cube
+from quantile_sketch import RELATIVE_ACCURACY, bucket_index
+
+ROLLUP_KEYS = [
+    ['job_category'],
+    ['cleaned_state', 'job_category'],
+    ['closest_metro', 'job_category'],
+    ['job_category', 'cleaned_city'],
+]
+
+
+@pytest.fixture(scope='module')
+def cube(listings):
+    return build_cube(listings)
+
+
+@pytest.fixture(scope='module')
+def merged(listings):
+    # The listings in three batches, merged one after the other
+    batches = [listings.iloc[:2_500], listings.iloc[2_500:4_000], listings.iloc[4_000:]]
+    cube = build_cube(batches[0])
+    for batch in batches[1:]:
+        cube = merge_cubes(cube, build_cube(batch))
+    return cube
+
+
+def job_counts(listings, keys):
+    # Float job counts of the listings with known keys, grouped by keys
+    known = listings.dropna(subset=keys)
+    return known['job_count'].astype('float64').groupby([known[key] for key in keys])
+
+
+@pytest.mark.parametrize('keys', ROLLUP_KEYS)
+def test_rollup_matches_pandas(cube, listings, keys):
+    expected = job_counts(listings, keys).agg(['count', 'mean', 'std', 'min', 'max']).astype('float64')
+    table = rollup(cube, keys, sort=True)
+    assert_frame_equal(table[['count', 'mean', 'std', 'min', 'max']].astype('float64'), expected,
+                       check_names=False, check_index_type=False)
+    assert table['listings'].sum() == len(listings.dropna(subset=keys))
+
+
+@pytest.mark.parametrize('keys', ROLLUP_KEYS)
+def test_medians_come_from_the_sketch_within_accuracy(cube, listings, keys):
+    expected = job_counts(listings, keys).median().dropna()
+    estimates = medians(cube, keys).reindex(expected.index)
+    # Sketch values are rounded to one decimal
+    assert (abs(estimates - expected) <= RELATIVE_ACCURACY * expected + 0.05).all()
+
+
+def test_cube_keeps_one_sketch_row_per_cell_and_bucket(cube, listings):
+    assert set(cube) == {'cells', 'sketch', 'titles'}
+    assert cube['sketch'].index.is_unique
+    assert cube['sketch'].index.get_level_values('cell').isin(cube['cells'].index).all()
+
+    known = listings[listings['job_count'].notna()]
+    assert cube['sketch']['n'].sum() == len(known)
+    assert len(cube['sketch']) <= len(cube['cells']) * len(np.unique(bucket_index(known['job_count'])))
+
+
+def test_merged_cells_match_one_pass(merged, cube):
+    # Same cells in the same first-appearance order
+    left = merged['cells'].astype({dimension: object for dimension in CUBE_DIMENSIONS})
+    right = cube['cells'].astype({dimension: object for dimension in CUBE_DIMENSIONS})
+    assert_frame_equal(left, right)
+    assert merged['cells']['count'].sum() < merged['cells']['rows'].sum()
+
+
+def test_merged_sketch_and_titles_match_one_pass(merged, cube):
+    assert_frame_equal(merged['sketch'].sort_index(), cube['sketch'].sort_index())
+    assert_frame_equal(merged['titles'].sort_index().astype(object), cube['titles'].sort_index().astype(object))
+
+
+@pytest.mark.parametrize('keys', ROLLUP_KEYS)
+def test_merged_rollups_match_one_pass(merged, cube, keys):
+    assert_frame_equal(rollup(merged, keys, sort=True), rollup(cube, keys, sort=True))
+    assert_series_equal(medians(merged, keys).sort_index(), medians(cube, keys).sort_index())
+
+
+def test_merge_leaves_its_inputs_alone(listings):
+    first, second = build_cube(listings.iloc[:3_000]), build_cube(listings.iloc[3_000:])
+    before = {name: table.copy() for name, table in first.items()}
+    merge_cubes(first, second)
+    for name, table in first.items():
+        assert_frame_equal(table, before[name])
+
+
+def test_slices_roll_up_like_the_filtered_listings(cube, listings):
+    keys = ['closest_airport', 'job_category']
+    sliced = slice_cube(cube, cleaned_state='TX', metro_distance_band=['Within Metro', 'Within 25 miles'])
+    subset = listings[(listings['cleaned_state'] == 'TX')
+                      & listings['metro_distance_band'].isin(['Within Metro', 'Within 25 miles'])]
+    assert_frame_equal(rollup(sliced, keys, sort=True), rollup(build_cube(subset), keys, sort=True),
+                       check_index_type=False, check_categorical=False)
+    assert_series_equal(medians(sliced, keys).sort_index(), medians(build_cube(subset), keys).sort_index(),
+                        check_index_type=False, check_categorical=False)
+    # Titles are only kept per (state, category)
+    assert 'titles' not in sliced and 'titles' in slice_cube(cube, cleaned_state='TX')
+
+
+def test_slices_can_be_sliced_again(cube, listings):
+    keys = ['job_category']
+    twice = slice_cube(slice_cube(cube, closest_metro='Houston'), metro_distance_band='Within Metro')
+    once = slice_cube(cube, closest_metro='Houston', metro_distance_band='Within Metro')
+    assert_frame_equal(rollup(twice, keys), rollup(once, keys))
+    assert_series_equal(medians(twice, keys), medians(once, keys))
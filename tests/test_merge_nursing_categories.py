@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from ingest import load_category_mapping, read_listings, remap_categories
+from merge_nursing_categories import merge_nursing_categories
+
+MAPPING = {'Licensed Practical Nurse': 'Registered Nurse', 'Porter': 'Janitor'}
+
+
+@pytest.mark.parametrize('dtype', ['category', object])
+def test_remap_renames_and_merges_categories(dtype):
+    values = ['Welder', 'Licensed Practical Nurse', None, 'Registered Nurse', 'Porter', 'Welder']
+    df = pd.DataFrame({'job_category': pd.Series(values, dtype=dtype), 'job_count': range(6)})
+    remapped = remap_categories(df, MAPPING)
+    assert remapped['job_category'].tolist()[:2] == ['Welder', 'Registered Nurse']
+    assert pd.isna(remapped['job_category'][2])
+    assert remapped['job_category'].tolist()[3:] == ['Registered Nurse', 'Janitor', 'Welder']
+    if dtype == 'category':
+        # Merged categories leave no empty category behind
+        assert remapped['job_category'].cat.categories.tolist() == ['Janitor', 'Registered Nurse', 'Welder']
+    assert df['job_category'].tolist()[1] == 'Licensed Practical Nurse'
+    assert remap_categories(df, {}) is df
+
+
+def test_reading_with_the_mapping_matches_a_replace(listings_csv, listings):
+    mapping = load_category_mapping()
+    assert mapping['Licensed Practical Nurse'] == 'Registered Nurse'
+    df = read_listings(listings_csv, category_mapping=mapping)
+    expected = listings['job_category'].replace(mapping)
+    assert (df['job_category'].astype(object) == expected).all()
+
+
+def test_merged_statistics_match_the_filtered_listings(listings):
+    analysis = merge_nursing_categories(listings, {'enhanced_analysis': {}, 'state_statistics': {}})
+    merged = listings.assign(job_category=listings['job_category'].replace(load_category_mapping()))
+    assert 'Licensed Practical Nurse' not in analysis['category_overview']
+    assert analysis['enhanced_analysis'] == {} and analysis['total_records'] == len(listings)
+    assert list(analysis['category_overview']) == merged['job_category'].unique().tolist()
+
+    nurses = merged[merged['job_category'] == 'Registered Nurse']
+    stats = analysis['category_overview']['Registered Nurse']
+    assert stats['listings_count'] == len(nurses)
+    assert stats['avg_jobs_per_listing'] == round(nurses['job_count'].mean(), 1)
+    assert stats['avg_jobs_per_city'] == round(nurses.groupby('cleaned_city')['job_count'].mean().mean(), 1)
+    assert (stats['min_jobs'], stats['max_jobs']) == (nurses['job_count'].min(), nurses['job_count'].max())
+
+    texas = merged[merged['cleaned_state'] == 'TX']
+    state = analysis['state_statistics']['TX']
+    assert state['total_listings'] == len(texas) and state['total_cities'] == texas['cleaned_city'].nunique()
+    assert list(state['categories']) == texas['job_category'].unique().tolist()
+    welders = texas[texas['job_category'] == 'Welder']
+    assert state['categories']['Welder']['cities_count'] == welders['cleaned_city'].nunique()
+    ranked = [category['avg_jobs_per_listing'] for category in state['top_3_categories']]
+    assert ranked == sorted(ranked, reverse=True) and len(ranked) == 3
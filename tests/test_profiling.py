@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from pipeline import analyze_listings, listing_tables, stage_names
+from profiling import output_size, profiling, profiling_active, stage
+
+
+@pytest.fixture(scope='module')
+def profiled(listings, tmp_path_factory):
+    # A profiled pipeline run: its result and the report it wrote
+    report_path = tmp_path_factory.mktemp('profile') / 'profile_report.json'
+    tables = listing_tables(listings)
+    with profiling(str(report_path), trace_memory=False):
+        assert profiling_active()
+        result = analyze_listings(tables)
+    with open(report_path) as f:
+        return result, {entry['stage']: entry for entry in json.load(f)['stages']}
+
+
+def test_every_pipeline_stage_is_reported(profiled):
+    _, entries = profiled
+    for name in stage_names():
+        assert entries[name]['depth'] == 0
+        assert entries[name]['wall_seconds'] >= 0
+    # Tables built inside a stage nest under it
+    assert any(path.startswith('statistics/') for path in entries)
+
+
+def test_in_place_edits_count_as_output(profiled):
+    result, entries = profiled
+    # The concentration stage edits enhanced_analysis in place rather than replacing it
+    assert entries['concentration']['output_bytes'] == output_size(
+        {'enhanced_analysis': result['enhanced_analysis']}
+    )[1]
+    assert entries['statistics']['output_bytes'] > entries['concentration']['output_bytes'] > 1_000
+
+
+def test_stages_outside_a_profiled_run_record_nothing():
+    assert not profiling_active()
+    with stage('anything', rows=10) as record:
+        record.output({'rows': [1, 2, 3]})
+    assert record.rows is None
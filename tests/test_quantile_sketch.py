@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import RELATIVE_ACCURACY, merge_sketches, sketch_percentiles, sketch_values
+
+PERCENTILES = [1, 25, 50, 75, 90, 99]
+
+
+def exact_percentiles(df):
+    # The value at position floor(q * (n - 1)) of each group's sorted values
+    exact = {}
+    for group, values in df.groupby('group')['job_count']:
+        values = np.sort(values.to_numpy())
+        exact[group] = {f'p{q:g}': values[int(np.floor(q / 100 * (len(values) - 1)))] for q in PERCENTILES}
+    return exact
+
+
+def job_counts(seed, rows=20_000):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'group': rng.choice(['a', 'b', 'c'], size=rows),
+        'job_count': np.concatenate([
+            rng.lognormal(np.log(250), 1.2, size=rows - 100).round().clip(1, 5000),
+            np.zeros(50),
+            rng.integers(1, 5, size=50),
+        ]),
+    })
+
+
+def assert_within_accuracy(estimates, exact):
+    for group, values in exact.items():
+        for label, value in values.items():
+            assert abs(estimates.at[group, label] - value) <= RELATIVE_ACCURACY * value + 1e-9, (group, label)
+
+
+def test_percentiles_within_relative_accuracy():
+    df = job_counts(0)
+    estimates = sketch_percentiles(sketch_values(df, ['group']), ['group'], PERCENTILES)
+    assert_within_accuracy(estimates, exact_percentiles(df))
+
+
+def test_merged_sketches_keep_the_bound():
+    first, second = job_counts(1), job_counts(2)
+    merged = merge_sketches([sketch_values(first, ['group']), sketch_values(second, ['group'])], ['group'])
+    estimates = sketch_percentiles(merged, ['group'], PERCENTILES)
+    assert_within_accuracy(estimates, exact_percentiles(pd.concat([first, second], ignore_index=True)))
+
+
+def test_missing_values_are_left_out():
+    df = pd.DataFrame({'group': ['a'] * 4, 'job_count': [10.0, np.nan, 20.0, np.nan]})
+    sketch = sketch_values(df, ['group'])
+    assert sketch['n'].sum() == 2
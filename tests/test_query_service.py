@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from incremental_stats import save_stats_source
+from ingest import listings_sha256, load_category_mapping
+from listing_cube import build_cube, rollup, save_cube
+from query_service import QueryService, load_service_cube
+
+
+@pytest.fixture(scope='module')
+def service(listings):
+    return QueryService(build_cube(listings))
+
+
+def get(service, target):
+    status, body = asyncio.run(service.answer('GET', target))
+    return status, json.loads(body)
+
+
+def test_rendered_answers_match_a_sliced_rollup(service):
+    assert len(service.rendered) > 0
+    for (path, params), (status, body) in service.rendered.items():
+        assert status == 200
+        # _answer renders from a slice of the cube, as filtered requests do
+        assert service._answer(path, {name: list(values) for name, values in params}) == (status, body)
+
+
+def test_queries_and_errors(service, listings):
+    status, body = get(service, '/query?group=cleaned_state&sort=listings&top=2')
+    assert status == 200
+    counts = listings['cleaned_state'].value_counts()
+    assert [row['cleaned_state'] for row in body['rows']] == counts.index[:2].tolist()
+    assert [row['listings'] for row in body['rows']] == counts.iloc[:2].tolist()
+
+    status, body = get(service, '/query?group=closest_metro,job_category&cleaned_state=TX&top=1&per=closest_metro')
+    assert status == 200 and len({row['closest_metro'] for row in body['rows']}) == len(body['rows'])
+
+    assert get(service, '/metro?name=Houston&job_category=Welder')[0] == 200
+    assert get(service, '/query?group=planet')[0] == 400
+    assert get(service, '/metro?name=Atlantis')[0] == 404
+    assert get(service, '/nowhere')[0] == 404
+    assert asyncio.run(service.answer('POST', '/health'))[0] == 405
+
+
+def test_concurrent_misses_share_one_computation(listings):
+    service = QueryService(build_cube(listings.head(500)))
+    calls = []
+    release = threading.Event()
+    answer = service._answer
+
+    def slow_answer(path, params):
+        calls.append(path)
+        release.wait(5)
+        return answer(path, params)
+    service._answer = slow_answer
+
+    async def requests():
+        pending = [asyncio.ensure_future(service.answer('GET', '/query?group=cleaned_state')) for _ in range(8)]
+        await asyncio.sleep(0.05)
+        assert len(service.in_flight) == 1
+        release.set()
+        return await asyncio.gather(*pending)
+
+    responses = asyncio.run(requests())
+    assert calls == ['/query']
+    assert len(set(responses)) == 1 and responses[0][0] == 200
+    assert service.in_flight == {}
+    assert asyncio.run(service.answer('GET', '/query?group=cleaned_state')) == responses[0]
+    assert calls == ['/query']
+
+
+@pytest.mark.parametrize('stored', [True, False], ids=['stored cube', 'csv'])
+def test_service_cube_merges_categories(listings, listings_csv, tmp_path, stored):
+    stats = str(tmp_path / 'stats.pkl')
+    if stored:
+        # Stored statistics are built without the merges
+        save_cube(build_cube(listings), stats)
+        save_stats_source({'listings_sha256': listings_sha256(listings_csv), 'deltas': []}, stats)
+    mapping = load_category_mapping()
+    cube = load_service_cube(stats, listings_csv, category_mapping=mapping)
+
+    merged = listings.assign(job_category=listings['job_category'].replace(mapping))
+    expected = merged.groupby('job_category').size()
+    table = rollup(cube, ['job_category'], sort=True)
+    assert table.index.tolist() == expected.index.tolist()
+    assert table['listings'].tolist() == expected.tolist()
+    rendered = QueryService(cube).rendered
+    assert ('/category', (('name', ('Registered Nurse',)),)) in rendered
+    assert ('/category', (('name', ('Licensed Practical Nurse',)),)) not in rendered
@@ -0,0 +1,66 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from metro_concentration import build_metro_concentration, metro_listing_counts
+from radius_concentration import (
+    build_radius_index, listing_miles, radius_concentration, radius_index_source, radius_state_concentration
+)
+from reference_data import city_coordinates
+
+
+@pytest.fixture(scope='module')
+def counts(listings):
+    return metro_listing_counts(listings)
+
+
+@pytest.mark.parametrize('radius', [0, 10, 17.5, 50, 120, 5_000])
+def test_radius_queries_match_a_scan_of_the_listings(counts, radius):
+    data = counts[counts['closest_metro'].notna()].copy()
+    data['miles'] = listing_miles(data)
+    data = data[data['miles'].notna()]
+    within = data[data['miles'] <= radius]
+
+    results = radius_concentration(build_radius_index(counts), radius)
+    assert set(results) == set(data['closest_metro'])
+    for metro, result in results.items():
+        rows = within[within['closest_metro'] == metro]
+        assert result['total_listings'] == data.loc[data['closest_metro'] == metro, 'listings'].sum()
+        assert result['within_radius_listings'] == rows['listings'].sum()
+        assert result['unique_cities'] == rows['cleaned_city'].nunique()
+        by_category = rows.groupby('job_category', observed=True)['listings'].sum().sort_values(ascending=False)
+        assert [listings for _, listings in result['top_categories']] == by_category.head(3).tolist()
+
+    # Metros are listed by total listings, largest first
+    totals = [result['total_listings'] for result in results.values()]
+    assert totals == sorted(totals, reverse=True)
+
+
+def test_band_only_data_matches_the_fixed_bands(counts):
+    # Without coordinates every distance falls back to its band's upper edge
+    no_coordinates = city_coordinates().iloc[:0]
+    results = radius_concentration(build_radius_index(counts, coordinates=no_coordinates), 50)
+    fixed = build_metro_concentration(counts)
+    for metro, result in results.items():
+        assert result['within_radius_listings'] == fixed[metro]['within_50_total']
+        assert result['concentration_percentage'] == fixed[metro]['concentration_percentage']
+
+    states = radius_state_concentration(results)
+    assert sum(state['total_listings'] for state in states.values()) == sum(
+        result['total_listings'] for result in results.values()
+    )
+    assert np.isinf(listing_miles(counts[counts['metro_distance_band'] == 'Beyond 50 miles'].head(1),
+                                  no_coordinates)).all()
+
+
+def test_index_source_follows_the_listings(listings_csv, tmp_path):
+    csv = tmp_path / 'listings.csv'
+    shutil.copy(listings_csv, csv)
+    source = radius_index_source(str(csv))
+    assert radius_index_source(str(csv)) == source
+
+    with open(csv, 'a') as f:
+        f.write('Welder 1,Welder,Tulsa,OK,,,,7\n')
+    changed = radius_index_source(str(csv))
+    assert changed['listings'] != source['listings'] and changed['coordinates'] == source['coordinates']
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from ranking import ranked_lists, top_k
+
+
+def test_ties_keep_table_order():
+    table = pd.DataFrame({
+        'state': ['TX', 'FL', 'TX', 'TX', 'FL', 'TX', 'FL'],
+        'category': ['Welder', 'Plumber', 'Cook', 'Nurse', 'Welder', 'Pilot', 'Cook'],
+        'avg': [5.0, 2.0, 7.0, 5.0, 2.0, 5.0, 9.0],
+    })
+    ranked = top_k(table, 'state', 'avg', 3)
+    # Groups in first-appearance order, equal values in table order, like a stable sorted(reverse=True)
+    assert ranked['state'].tolist() == ['TX', 'TX', 'TX', 'FL', 'FL', 'FL']
+    assert ranked['category'].tolist() == ['Cook', 'Welder', 'Nurse', 'Cook', 'Plumber', 'Welder']
+    assert ranked['rank'].tolist() == [1, 2, 3, 1, 2, 3]
+
+    for state, rows in table.groupby('state', sort=False):
+        expected = sorted(rows.itertuples(index=False), key=lambda row: row.avg, reverse=True)[:3]
+        assert ranked.loc[ranked['state'] == state, 'category'].tolist() == [row.category for row in expected]
+
+
+def test_later_metrics_break_ties():
+    table = pd.DataFrame({'group': ['a'] * 4, 'name': ['w', 'x', 'y', 'z'],
+                          'avg': [3.0, 3.0, 3.0, 1.0], 'listings': [10, 30, 20, 99]})
+    ranked = top_k(table, 'group', ['avg', 'listings'], 2, ascending=[False, True])
+    assert ranked['name'].tolist() == ['w', 'y']
+
+
+def test_ranked_lists():
+    table = pd.DataFrame({'city': ['A', 'A', 'B'], 'category': ['x', 'y', 'z'], 'avg': [1.0, 2.0, 3.0]})
+    lists = ranked_lists(top_k(table, 'city', 'avg', 1), 'city', {'category': 'category'})
+    assert lists == {'A': [{'rank': 1, 'category': 'y'}], 'B': [{'rank': 1, 'category': 'z'}]}
@@ -0,0 +1,48 @@
+import pandas as pd
+
+from reference_data import (
+    by_name, city_coordinates, city_populations, in_reference, join_reference, load_reference, major_metros,
+    metro_coordinates, metro_names
+)
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_tables_are_keyed_by_city_and_state(tmp_path):
+    path = write(tmp_path, 'populations.csv',
+                 'city,state,population\nSmyrna,GA,56000\nSmyrna,TN,53000\nMesquite,TX,150000\nSmyrna,GA,57000\n')
+    populations = city_populations(path)
+    assert populations.index.names == ['city', 'state']
+    # Same-named cities stay apart; a repeated place keeps its last row
+    assert populations.loc[('Smyrna', 'GA'), 'population'] == 57000
+    assert populations.loc[('Smyrna', 'TN'), 'population'] == 53000
+    assert len(populations) == 3
+    assert load_reference(path) is populations
+
+
+def test_join_keeps_frame_order_and_rows(tmp_path):
+    populations = city_populations(write(tmp_path, 'populations.csv',
+                                         'city,state,population\nSmyrna,GA,56000\nSmyrna,TN,53000\n'))
+    frame = pd.DataFrame({'cleaned_city': ['Smyrna', 'Tulsa', 'Smyrna'], 'cleaned_state': ['TN', 'OK', 'GA']})
+    joined = join_reference(frame, populations, 'cleaned_city', 'cleaned_state')
+    assert joined['cleaned_state'].tolist() == ['TN', 'OK', 'GA']
+    assert joined['population'].tolist()[::2] == [53000, 56000] and pd.isna(joined['population'][1])
+    assert in_reference(frame, populations, 'cleaned_city', 'cleaned_state').tolist() == [True, False, True]
+    assert len(join_reference(frame, populations, 'cleaned_city', 'cleaned_state', how='inner')) == 2
+    # By-name views: the last row of a repeated name wins
+    assert by_name(populations, 'population') == {'Smyrna': 53000}
+
+
+def test_shipped_tables_fit_together():
+    metros = major_metros()
+    assert metros.index.is_unique and len(metros) > 0
+    located = metro_coordinates()
+    # Every major metro center has coordinates, listed in name order
+    assert sorted(located.index) == sorted(metro_names()) == located.index.tolist()
+    assert in_reference(metros.index.to_frame(index=False), city_coordinates()).all()
+    assert city_populations()['population'].gt(0).all()
+    assert by_name(city_coordinates(), ['lat', 'lng'])['Houston'] == [29.7604, -95.3698]
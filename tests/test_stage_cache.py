@@ -0,0 +1,74 @@
+import shutil
+
+import pytest
+
+import pipeline
+from pipeline import listing_tables, run_pipeline, stage_names
+from stage_cache import StageCache, digest, file_digest
+
+
+@pytest.fixture(scope='module')
+def tables(listings):
+    return listing_tables(listings)
+
+
+def run(tables, cache, capsys, **parameters):
+    # (analysis, names of the stages served from the cache)
+    analysis = run_pipeline(tables, parameters=dict({'listings': 'synthetic'}, **parameters), cache=cache)
+    output = capsys.readouterr().out
+    return analysis, [name for name in stage_names() if f'PIPELINE STAGE: {name} (cached)' in output]
+
+
+def test_entries_are_keyed_by_inputs(tmp_path):
+    cache = StageCache(str(tmp_path))
+    key = cache.key('power_cities', {'top_cities': 3}, digest({}))
+    assert cache.lookup('power_cities', key) is None
+
+    output = cache.store('power_cities', key, {'power_cities_analysis': {}}, {'top_cities': 3})
+    assert cache.lookup('power_cities', key) == output
+    assert cache.load('power_cities', key) == {'power_cities_analysis': {}}
+    assert cache.lookup('power_cities', cache.key('power_cities', {'top_cities': 5}, digest({}))) is None
+    assert cache.lookup('power_cities', cache.key('power_cities', {'top_cities': 3}, digest({'a': 1}))) is None
+
+
+def test_file_digest_follows_content(tmp_path):
+    path = tmp_path / 'reference.csv'
+    path.write_text('city,state\nMesa,AZ\n')
+    before = file_digest(str(path))
+    path.write_text('city,state\nMesa,AZ\nTempe,AZ\n')
+    assert file_digest(str(path)) != before
+
+
+def test_rerun_recomputes_only_changed_stages(tables, tmp_path, capsys):
+    cache = StageCache(str(tmp_path))
+    first, cached = run(tables, cache, capsys)
+    assert cached == []
+
+    again, cached = run(tables, cache, capsys)
+    assert cached == stage_names()
+    assert digest(again) == digest(first)
+
+    # power_cities reads top_cities and feeds concentration
+    changed, cached = run(tables, cache, capsys, top_cities=5)
+    assert cached == ['statistics', 'population', 'enhanced']
+    assert digest(changed) != digest(first)
+
+    # Other listings invalidate every stage that reads them
+    _, cached = run(tables, cache, capsys, listings='other')
+    assert cached == ['population', 'power_cities']
+
+
+def test_changed_reference_file_recomputes_its_stage(tables, tmp_path, monkeypatch, capsys):
+    cache = StageCache(str(tmp_path / 'cache'))
+    first, _ = run(tables, cache, capsys)
+
+    populations = tmp_path / 'populations.csv'
+    shutil.copy(pipeline.POPULATIONS_FILE, populations)
+    monkeypatch.setattr(pipeline, 'POPULATIONS_FILE', str(populations))
+    with open(populations, 'a') as f:
+        f.write('\n')
+
+    # population is recomputed under its new key; its output is unchanged, so later stages stay cached
+    again, cached = run(tables, cache, capsys)
+    assert cached == ['statistics', 'enhanced', 'power_cities', 'concentration']
+    assert digest(again) == digest(first)